@@ -1,3 +1,5 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
 from typing import Optional
 
 import jwt
@@ -7,8 +9,10 @@ from jwt.exceptions import InvalidTokenError
 from passlib.context import CryptContext
 from datetime import datetime, timedelta, timezone
 from ..settings.config import settings
+from ..cache.ttl_cache import TTLCache
 
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from ..database import get_db
 from ..schemas import TokenData
@@ -21,29 +25,37 @@ ALGORITHM = settings.ALGORITHM
 ACCESS_TOKEN_EXPIRE_MINUTES = settings.ACCESS_TOKEN_EXPIRE_MINUTES
 
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# bcrypt занимает сотни миллисекунд CPU, поэтому хэширование выполняется в отдельном пуле потоков
+password_executor = ThreadPoolExecutor(max_workers=settings.PASSWORD_HASH_WORKERS, thread_name_prefix="password-hash")
+
+# Проверенные токены (до их exp) и пользователи по id, чтобы не ходить в базу на каждый запрос
+token_cache = TTLCache(maxsize=settings.TOKEN_CACHE_MAXSIZE, ttl=ACCESS_TOKEN_EXPIRE_MINUTES * 60)
+principal_cache = TTLCache(maxsize=settings.PRINCIPAL_CACHE_MAXSIZE, ttl=settings.PRINCIPAL_CACHE_TTL)
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="auth/token", auto_error=False)
 
 router = APIRouter()
 
 
-def verify_password(plain_password, hashed_password):
-    return pwd_context.verify(plain_password, hashed_password)
+async def verify_password(plain_password, hashed_password):
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(password_executor, pwd_context.verify, plain_password, hashed_password)
 
 
-def get_password_hash(password):
-    return pwd_context.hash(password)
+async def get_password_hash(password):
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(password_executor, pwd_context.hash, password)
 
 
-def get_user(db: Session, username: str):
-    db_user = db.query(User).filter(User.username == username).first()
+async def get_user(db: AsyncSession, username: str):
+    db_user = await db.scalar(select(User).where(User.username == username))
     return db_user
 
 
-def authenticate_user(db: Session, username: str, password: str):
-    user = get_user(db, username)
+async def authenticate_user(db: AsyncSession, username: str, password: str):
+    user = await get_user(db, username)
     if not user:
         return False
-    if not verify_password(password, user.hashed_password):
+    if not await verify_password(password, user.hashed_password):
         return False
     return user
 
@@ -59,20 +71,43 @@ def create_access_token(data: dict, expires_delta: timedelta | None = None):
     return encoded_jwt
 
 
-async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)) -> Optional[User]:
-    if not token:
-        return None  # Если токена нет, пользователь не авторизован
+def decode_token_user_id(token: str) -> Optional[int]:
+    """
+    Проверить токен и вернуть id пользователя. Результат запоминается до истечения токена.
+    """
+    user_id = token_cache.get(token)
+    if user_id is not None:
+        return user_id
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        user_id: int = int(payload.get("sub"))  # Получаем id из токена
-        if user_id is None:
-            return None
-    except InvalidTokenError:
+        user_id = int(payload.get("sub"))  # Получаем id из токена
+    except (InvalidTokenError, TypeError, ValueError):
         return None
+    token_cache.set(token, user_id, ttl=payload["exp"] - datetime.now(timezone.utc).timestamp())
+    return user_id
+
+
+def invalidate_principal(user_id: int):
+    principal_cache.pop(user_id)
+
+
+async def get_current_user(token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_db)) -> Optional[User]:
+    if not token:
+        return None  # Если токена нет, пользователь не авторизован
+    user_id = decode_token_user_id(token)
+    if user_id is None:
+        return None
+
+    user = principal_cache.get(user_id)
+    if user is not None:
+        return user
 
-    user = db.query(User).filter(User.id == user_id).first()  # Ищем пользователя по id
+    user = await db.get(User, user_id)  # Ищем пользователя по id
     if user is None:
         return None
+    # Пользователь отвязывается от сессии запроса, так как объект используется и другими запросами
+    db.expunge(user)
+    principal_cache.set(user_id, user)
     return user
 
 
@@ -0,0 +1,44 @@
+"""
+Общие помощники бенчмарков: перцентили, задержка event loop, сводки для отчётов.
+"""
+import asyncio
+import statistics
+import subprocess
+import time
+from typing import List, Optional
+
+
+def percentile(values, q):
+    values = sorted(values)
+    if not values:
+        return 0.0
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+async def probe_loop_lag(stop: asyncio.Event, interval: float, lags: list):
+    # Насколько позже запланированного просыпается задача — это и есть блокировка event loop
+    while not stop.is_set():
+        started = time.perf_counter()
+        await asyncio.sleep(interval)
+        lags.append(time.perf_counter() - started - interval)
+
+
+def latency_summary(latencies: List[float]) -> dict:
+    """
+    Задержки в секундах -> сводка в миллисекундах.
+    """
+    return {
+        "mean": round(statistics.fmean(latencies) * 1000, 2) if latencies else 0.0,
+        "p50": round(percentile(latencies, 0.50) * 1000, 2),
+        "p95": round(percentile(latencies, 0.95) * 1000, 2),
+        "p99": round(percentile(latencies, 0.99) * 1000, 2),
+        "max": round(max(latencies, default=0.0) * 1000, 2),
+    }
+
+
+def git_commit() -> Optional[str]:
+    # Коммит, на котором сняты цифры, чтобы отчёты можно было сравнивать между версиями
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
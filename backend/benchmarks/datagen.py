@@ -0,0 +1,235 @@
+"""
+Генератор синтетических данных для нагрузочных тестов: пользователи, посты с тегами, подписки, просмотры,
+лайки, комментарии и уведомления. При одинаковых параметрах и seed получается один и тот же набор данных
+(даты отсчитываются от начала текущего часа, чтобы окна рейтинга 24h/7d оставались осмысленными).
+
+Популярность постов и авторов распределена по закону Ципфа: небольшая часть постов собирает
+большинство просмотров и лайков, а у немногих авторов большинство подписчиков — как в реальной ленте.
+У всех пользователей один пароль BENCH_PASSWORD, чтобы нагрузочный тест мог проверять вход.
+
+Запуск из корня репозитория (база должна быть пустой):
+    python -m backend.benchmarks.datagen --db-url sqlite+aiosqlite:////tmp/bench.db --users 10000 --views 1000000
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import time
+from datetime import datetime, timedelta
+from itertools import accumulate
+from typing import List
+
+BENCH_PASSWORD = "bench-password"
+INSERT_CHUNK_SIZE = 5000
+
+CATEGORIES = ["programming", "design", "science", "travel", "music", "sport", "food", "games"]
+WORDS = (
+    "асинхронный запрос база индекс кэш лента пост автор подписка просмотр лайк комментарий сервер клиент "
+    "очередь задача пул соединение транзакция курсор страница ответ заголовок сжатие метрика задержка"
+).split()
+
+
+def zipf_cum_weights(size: int, exponent: float) -> List[float]:
+    # Накопленные веса для random.choices: элемент с рангом r выбирается с вероятностью ~ 1 / r^exponent
+    return list(accumulate(1.0 / rank ** exponent for rank in range(1, size + 1)))
+
+
+def sentence(rng: random.Random, words: int) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(words)).capitalize()
+
+
+def post_body(rng: random.Random) -> str:
+    paragraphs = rng.randint(3, 30)
+    return "".join(f"<p>{sentence(rng, rng.randint(20, 60))}.</p>" for _ in range(paragraphs))
+
+
+async def insert_chunks(conn, model, rows: List[dict]):
+    for start in range(0, len(rows), INSERT_CHUNK_SIZE):
+        await conn.execute(model.__table__.insert(), rows[start:start + INSERT_CHUNK_SIZE])
+
+
+async def generate(users: int, posts: int, authors: float, follows_per_user: int, views: int, likes: int,
+                   comments: int, notifications: int, seed: int, related: bool = True) -> dict:
+    """
+    Заполнить пустую базу синтетическими данными и вернуть число созданных строк по таблицам.
+    Строки вставляются пачками через Core (executemany), денормализованные счётчики пересчитываются в конце
+    теми же запросами, что и при миграции схемы.
+    """
+    from sqlalchemy import func, insert, select, text
+
+    from ..auth.auth_handler import pwd_context
+    from ..database import COLUMN_BACKFILLS, INDEX_PREPARES, SessionLocal, engine
+    from ..migrate import migrate
+    from ..models import Follow, Notification, Post, PostComment, PostLike, PostTag, PostView, RelatedPost, User
+    from ..settings.config import settings
+    from ..workers.related_posts import related_posts_indexer
+
+    await migrate()
+    async with engine.connect() as conn:
+        if await conn.scalar(select(func.count()).select_from(User)):
+            raise SystemExit("Database is not empty: generate into a new database")
+
+    rng = random.Random(seed)
+    now = datetime.now().replace(minute=0, second=0, microsecond=0)
+    started = time.perf_counter()
+
+    # Один хэш на всех: bcrypt на каждого пользователя занял бы минуты
+    hashed_password = pwd_context.hash(BENCH_PASSWORD)
+    user_rows = [
+        {"id": user_id, "username": f"bench_user_{user_id}", "email": f"bench_user_{user_id}@example.com",
+         "hashed_password": hashed_password, "is_active": True}
+        for user_id in range(1, users + 1)
+    ]
+
+    # Авторы — часть пользователей; чем выше ранг автора в выборке, тем больше у него постов и подписчиков
+    author_ids = rng.sample(range(1, users + 1), max(1, int(users * authors)))
+    author_weights = zipf_cum_weights(len(author_ids), 1.1)
+    tags = [f"tag{index}" for index in range(200)]
+    tag_weights = zipf_cum_weights(len(tags), 1.0)
+
+    post_rows, post_tag_rows = [], []
+    for post_id, author_id in enumerate(rng.choices(author_ids, cum_weights=author_weights, k=posts), start=1):
+        post_tags = sorted(set(rng.choices(tags, cum_weights=tag_weights, k=rng.randint(1, 5))))
+        post_rows.append({
+            "id": post_id,
+            "title": sentence(rng, rng.randint(3, 9)),
+            "body": post_body(rng),
+            "date": now - timedelta(seconds=rng.randint(0, 90 * 24 * 3600)),
+            "author_id": author_id,
+            "tags": post_tags,
+            "category": rng.choice(CATEGORIES),
+            "slug": f"bench/{post_id}",
+            "main_image": f"/images/{rng.getrandbits(256):064x}.png" if rng.random() < 0.7 else None,
+            "likes": 0,
+        })
+        post_tag_rows.extend({"post_id": post_id, "tag": tag} for tag in PostTag.normalize(post_tags))
+    post_dates = [row["date"] for row in post_rows]
+
+    # Популярность постов не связана с их номером: перемешанный порядок рангов
+    post_ids = list(range(1, posts + 1))
+    rng.shuffle(post_ids)
+    post_weights = zipf_cum_weights(posts, 1.0)
+
+    def after_post(post_id: int) -> datetime:
+        post_date = post_dates[post_id - 1]
+        return post_date + (now - post_date) * rng.random()
+
+    follow_pairs = set()
+    for follower_id in range(1, users + 1):
+        for followed_id in rng.choices(author_ids, cum_weights=author_weights, k=follows_per_user):
+            if followed_id != follower_id:
+                follow_pairs.add((follower_id, followed_id))
+    follow_rows = [
+        {"follower_id": follower_id, "followed_id": followed_id,
+         "date": now - timedelta(seconds=rng.randint(0, 180 * 24 * 3600))}
+        for follower_id, followed_id in sorted(follow_pairs)
+    ]
+
+    view_rows = [
+        {"post_id": post_id, "ip_address": f"10.{rng.randrange(256)}.{rng.randrange(256)}.{rng.randrange(1, 255)}",
+         "timestamp": after_post(post_id)}
+        for post_id in rng.choices(post_ids, cum_weights=post_weights, k=views)
+    ]
+
+    like_pairs = set()
+    for post_id in rng.choices(post_ids, cum_weights=post_weights, k=likes):
+        like_pairs.add((post_id, rng.randint(1, users)))
+    like_rows = [{"post_id": post_id, "user_id": user_id} for post_id, user_id in sorted(like_pairs)]
+
+    comment_rows = [
+        {"post_id": post_id, "author_id": rng.randint(1, users), "body": sentence(rng, rng.randint(5, 40)),
+         "date": after_post(post_id)}
+        for post_id in rng.choices(post_ids, cum_weights=post_weights, k=comments)
+    ]
+
+    # Прочитанные уведомления старше срока хранения удалил бы воркер очистки при старте приложения
+    read_cutoff = now - timedelta(days=settings.NOTIFICATION_READ_RETENTION_DAYS)
+    notification_rows = []
+    for _ in range(notifications):
+        post_id = rng.randint(1, posts)
+        author_id = post_rows[post_id - 1]["author_id"]
+        date = after_post(post_id)
+        notification_rows.append({
+            "user_id": rng.randint(1, users),
+            "title": f"bench_user_{author_id} опубликовал новый пост",
+            "description": post_rows[post_id - 1]["title"],
+            "link": f"/posts/bench/{post_id}",
+            "date": date,
+            "is_read": rng.random() < 0.7 and date > read_cutoff,
+        })
+
+    tables = [
+        (User, user_rows), (Post, post_rows), (PostTag, post_tag_rows), (Follow, follow_rows),
+        (PostView, view_rows), (PostLike, like_rows), (PostComment, comment_rows), (Notification, notification_rows),
+    ]
+    async with engine.begin() as conn:
+        for model, rows in tables:
+            await insert_chunks(conn, model, rows)
+        for statement in list(COLUMN_BACKFILLS.values()) + INDEX_PREPARES["ux_post_likes_post_user"][1:]:
+            await conn.execute(text(statement))
+
+    if related:
+        # Списки считаются для всех постов, поэтому достаточно собственного списка каждого поста
+        # (refresh ещё и пересобирает списки соседей — на больших объёмах это в разы дольше)
+        async with SessionLocal() as db:
+            for post_id in range(1, posts + 1):
+                candidates = await related_posts_indexer.score_candidates(db, post_id)
+                if candidates:
+                    await db.execute(insert(RelatedPost), [
+                        {"post_id": post_id, "related_post_id": candidate_id, "score": score}
+                        for candidate_id, score in candidates[:related_posts_indexer.size]
+                    ])
+            await db.commit()
+
+    return {
+        "seed": seed,
+        "rows": {model.__tablename__: len(rows) for model, rows in tables},
+        "seconds": round(time.perf_counter() - started, 1),
+    }
+
+
+def add_arguments(parser: argparse.ArgumentParser):
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--posts", type=int, default=5000)
+    parser.add_argument("--authors", type=float, default=0.1, help="доля пользователей, которые пишут посты")
+    parser.add_argument("--follows-per-user", type=int, default=20)
+    parser.add_argument("--views", type=int, default=100000)
+    parser.add_argument("--likes", type=int, default=20000)
+    parser.add_argument("--comments", type=int, default=10000)
+    parser.add_argument("--notifications", type=int, default=20000)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--no-related", dest="related", action="store_false",
+                        help="не считать похожие посты (долго на больших объёмах)")
+
+
+def generate_options(args: argparse.Namespace) -> dict:
+    return {
+        "users": args.users, "posts": args.posts, "authors": args.authors, "follows_per_user": args.follows_per_user,
+        "views": args.views, "likes": args.likes, "comments": args.comments, "notifications": args.notifications,
+        "seed": args.seed, "related": args.related,
+    }
+
+
+async def run(options: dict) -> dict:
+    from ..database import engine
+
+    try:
+        return await generate(**options)
+    finally:
+        await engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--db-url", required=True)
+    add_arguments(parser)
+    args = parser.parse_args()
+
+    # Настройки читаются при импорте модулей бэкенда, поэтому адрес базы задаётся до него
+    os.environ["DB_URL"] = args.db_url
+    print(json.dumps(asyncio.run(run(generate_options(args))), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+"""
+Бенчмарк кодирования ленты: время сериализации и размер ответа /get_all_posts на 100 постах
+для стандартного json и orjson, без сжатия, с gzip и с brotli.
+
+Запуск из корня репозитория:
+    python -m backend.benchmarks.feed_encoding --posts 100 --repeat 200
+
+Приложение поднимается в процессе (ASGI без сети) на временной базе (DB_URL указывает на временный файл).
+"""
+import argparse
+import asyncio
+import gzip
+import json
+import os
+import statistics
+import tempfile
+import time
+
+
+def timed(function, repeat: int) -> float:
+    # Медиана в миллисекундах устойчивее к случайным паузам, чем среднее
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function()
+        samples.append(time.perf_counter() - started)
+    return round(statistics.median(samples) * 1000, 3)
+
+
+async def seed(posts: int):
+    from ..database import SessionLocal
+    from ..models import Post, PostTag, User
+
+    body = "<p>" + " ".join(f"Абзац {i} с <b>разметкой</b> и текстом поста." for i in range(60)) + "</p>"
+    async with SessionLocal() as db:
+        author = User(username="bench_author", email="bench@example.com", hashed_password="-")
+        db.add(author)
+        await db.flush()
+        for i in range(posts):
+            tags = ["python", "fastapi", f"tag{i % 7}"]
+            post = Post(title=f"Пост номер {i}", body=body, author_id=author.id, slug=f"bench/{i}",
+                        main_image=f"/images/{i:064x}.png", tags=tags, category="bench")
+            db.add(post)
+            await db.flush()
+            db.add_all([PostTag(post_id=post.id, tag=tag) for tag in PostTag.normalize(tags)])
+        await db.commit()
+
+
+async def measure_wire(posts: int, repeat: int) -> dict:
+    import httpx
+    from ..main import app
+    from ..cache.response_cache import post_response_cache
+    from ..compression import brotli
+
+    encodings = ["identity", "gzip"] + (["br"] if brotli is not None else [])
+    results = {}
+    async with app.router.lifespan_context(app):
+        await seed(posts)
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            url = f"/get_all_posts?count={posts}"
+            for encoding in encodings:
+                latencies = []
+                for _ in range(repeat):
+                    # Каждый запрос мимо кэша ответов, чтобы мерить полную генерацию ответа
+                    post_response_cache.invalidate()
+                    started = time.perf_counter()
+                    response = await client.get(url, headers={"Accept-Encoding": encoding})
+                    latencies.append(time.perf_counter() - started)
+                    response.raise_for_status()
+                results[encoding] = {
+                    "content_encoding": response.headers.get("content-encoding", "identity"),
+                    "bytes_on_wire": int(response.headers["content-length"]),
+                    "latency_ms_p50": round(statistics.median(latencies) * 1000, 3),
+                }
+            payload = response.json()
+    return {"wire": results, "payload": payload}
+
+
+def measure_encoders(payload, repeat: int) -> dict:
+    from fastapi.encoders import jsonable_encoder
+    from fastapi.responses import JSONResponse, ORJSONResponse
+    from ..compression import brotli
+
+    results = {}
+    for name, response_class in (("json", JSONResponse), ("orjson", ORJSONResponse)):
+        body = response_class(payload).body
+        results[name] = {
+            # Обычный путь FastAPI для эндпоинтов без response_model: jsonable_encoder, затем render
+            "encode_ms": timed(lambda: response_class(jsonable_encoder(payload)), repeat),
+            # Путь лент (json_items_response): данные уже готовы к JSON, только render
+            "render_only_ms": timed(lambda: response_class(payload), repeat),
+            "bytes": len(body),
+        }
+
+    body = ORJSONResponse(payload).body
+    compression = {"gzip_6": {"ms": timed(lambda: gzip.compress(body, compresslevel=6), repeat),
+                              "bytes": len(gzip.compress(body, compresslevel=6))}}
+    if brotli is not None:
+        compression["br_4"] = {"ms": timed(lambda: brotli.compress(body, quality=4), repeat),
+                               "bytes": len(brotli.compress(body, quality=4))}
+    results["compression"] = compression
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--posts", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    # Настройки читаются при импорте приложения, поэтому временная база задаётся до него
+    os.environ["DB_URL"] = f"sqlite+aiosqlite:///{os.path.join(tempfile.mkdtemp(prefix='feed-bench-'), 'bench.db')}"
+    measured = asyncio.run(measure_wire(args.posts, args.repeat))
+    print(json.dumps({
+        "posts": args.posts,
+        "repeat": args.repeat,
+        "encoders": measure_encoders(measured["payload"], args.repeat),
+        "wire": measured["wire"],
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
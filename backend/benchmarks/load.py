@@ -0,0 +1,425 @@
+"""
+Нагрузочный тест приложения в процессе (ASGI без сети) со смесью запросов: лента, пост целиком, лайки,
+просмотры и вход, а затем рассылка уведомлений о новом посте подписчикам, подключённым по websocket.
+
+Результат — JSON-отчёт: пропускная способность и задержки по сценариям, число SQL-запросов на запрос
+по маршрутам, статистика кэша и задержка event loop. С --baseline в отчёт добавляется сравнение
+с отчётом другого коммита.
+
+Запуск из корня репозитория:
+    python -m backend.benchmarks.datagen --db-url sqlite+aiosqlite:////tmp/bench.db --users 10000 --views 1000000
+    python -m backend.benchmarks.load --db-url sqlite+aiosqlite:////tmp/bench.db --duration 30 --output before.json
+    python -m backend.benchmarks.load --db-url sqlite+aiosqlite:////tmp/bench.db --baseline before.json
+
+Тест меняет данные (лайки, просмотры, новые посты), поэтому для сравнимых цифр каждый прогон лучше делать
+на свежей копии базы. Без --db-url небольшой набор данных генерируется во временную базу.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import tempfile
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional
+
+from . import datagen
+from .common import git_commit, latency_summary, probe_loop_lag
+
+SCENARIOS = ("feed", "post", "like", "view", "login")
+DEFAULT_MIX = "feed=40,post=30,like=10,view=15,login=5"
+SAMPLE_SIZE = 1000
+
+
+def parse_mix(mix: str) -> Dict[str, float]:
+    weights = {}
+    for part in mix.split(","):
+        name, _, weight = part.partition("=")
+        if name.strip() not in SCENARIOS:
+            raise argparse.ArgumentTypeError(f"Unknown scenario {name!r}, expected one of {', '.join(SCENARIOS)}")
+        weights[name.strip()] = float(weight)
+    return weights
+
+
+class ASGIWebSocket:
+    """
+    Websocket-клиент, который вызывает ASGI-приложение напрямую, без сети (как httpx.ASGITransport для HTTP).
+    """
+
+    def __init__(self, app, path: str, query_string: str = ""):
+        self.app = app
+        self.scope = {
+            "type": "websocket", "asgi": {"version": "3.0"}, "scheme": "ws", "http_version": "1.1",
+            "path": path, "raw_path": path.encode(), "root_path": "", "query_string": query_string.encode(),
+            "headers": [(b"host", b"bench")], "client": ("127.0.0.1", 0), "server": ("bench", 80), "subprotocols": [],
+        }
+        self._to_app: asyncio.Queue = asyncio.Queue()
+        self._from_app: asyncio.Queue = asyncio.Queue()
+        self._task: Optional[asyncio.Task] = None
+
+    async def connect(self):
+        self._task = asyncio.create_task(self.app(self.scope, self._to_app.get, self._from_app.put))
+        await self._to_app.put({"type": "websocket.connect"})
+        message = await self._from_app.get()
+        if message["type"] != "websocket.accept":
+            raise ConnectionError(f"Websocket rejected: {message}")
+
+    async def receive_json(self):
+        message = await self._from_app.get()
+        if message["type"] == "websocket.close":
+            raise ConnectionError(f"Websocket closed by server with code {message.get('code')}")
+        return json.loads(message.get("text") or message["bytes"])
+
+    async def close(self):
+        await self._to_app.put({"type": "websocket.disconnect", "code": 1000})
+        await self._task
+
+
+class LoadTest:
+    def __init__(self, app, duration: float, concurrency: int, mix: Dict[str, float], seed: int):
+        self.app = app
+        self.duration = duration
+        self.concurrency = concurrency
+        self.mix = mix
+        self.seed = seed
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.statuses: Dict[str, Dict[int, int]] = defaultdict(lambda: defaultdict(int))
+        self.users: List[tuple] = []
+        self.posts: List[tuple] = []
+        self.tokens: Dict[int, str] = {}
+
+    async def load_sample(self):
+        from sqlalchemy import select
+
+        from ..auth.auth_handler import create_access_token
+        from ..database import SessionLocal
+        from ..models import Post, User
+
+        async with SessionLocal() as db:
+            self.users = (await db.execute(
+                select(User.id, User.username).where(User.username.like("bench_user_%")).order_by(User.id).limit(SAMPLE_SIZE)
+            )).all()
+            # Самые просматриваемые посты первыми: по их порядку выбор идёт с распределением Ципфа
+            self.posts = (await db.execute(
+                select(Post.id, Post.slug).order_by(Post.views_count.desc(), Post.id).limit(SAMPLE_SIZE)
+            )).all()
+        if not self.users or not self.posts:
+            raise SystemExit("No benchmark data: run backend.benchmarks.datagen first")
+        self.tokens = {
+            user_id: create_access_token(data={"sub": str(user_id)}, expires_delta=timedelta(hours=2))
+            for user_id, _ in self.users
+        }
+
+    def auth(self, user_id: int) -> dict:
+        return {"Authorization": f"Bearer {self.tokens[user_id]}"}
+
+    async def request(self, client, rng: random.Random, scenario: str):
+        import httpx
+
+        user_id, username = rng.choice(self.users)
+        post_id, slug = rng.choices(self.posts, cum_weights=self.post_weights)[0]
+        if scenario == "feed":
+            # Первые страницы открывают чаще; половина запросов — от вошедших пользователей с лайками и подписками
+            page = rng.choices(range(1, 11), cum_weights=self.page_weights)[0]
+            if rng.random() < 0.5:
+                return await client.get(f"/get_all_posts?count=20&page={page}")
+            return await client.get(f"/get_all_posts?count=20&page={page}&with_viewer_state=1",
+                                    headers=self.auth(user_id))
+        if scenario == "post":
+            return await client.get(f"/getpost/{slug}/?comments_limit=20")
+        if scenario == "like":
+            action = "like_post" if rng.random() < 0.6 else "unlike_post"
+            return await client.post(f"/{action}/{post_id}/", headers=self.auth(user_id))
+        if scenario == "view":
+            # Просмотры учитываются по IP, поэтому у каждого запроса свой адрес клиента
+            address = f"172.{rng.randrange(16, 32)}.{rng.randrange(256)}.{rng.randrange(1, 255)}"
+            transport = httpx.ASGITransport(app=self.app, client=(address, 50000))
+            async with httpx.AsyncClient(transport=transport, base_url="http://bench") as view_client:
+                return await view_client.post(f"/increment_views/{post_id}/")
+        return await client.post("/auth/token", data={"username": username, "password": datagen.BENCH_PASSWORD})
+
+    async def worker(self, index: int, deadline: float):
+        import httpx
+
+        rng = random.Random(self.seed * 1000 + index)
+        scenarios = list(self.mix)
+        weights = list(self.mix.values())
+        transport = httpx.ASGITransport(app=self.app, client=(f"10.0.{index // 250}.{index % 250 + 1}", 50000))
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            while time.perf_counter() < deadline:
+                scenario = rng.choices(scenarios, weights)[0]
+                started = time.perf_counter()
+                try:
+                    status = (await self.request(client, rng, scenario)).status_code
+                except Exception:
+                    status = 0
+                self.latencies[scenario].append(time.perf_counter() - started)
+                self.statuses[scenario][status] += 1
+
+    async def run_http(self) -> dict:
+        from ..cache.response_cache import post_response_cache
+        from ..instrumentation import REQUEST_QUERIES, REQUEST_SQL_TIME
+
+        self.post_weights = datagen.zipf_cum_weights(len(self.posts), 1.0)
+        self.page_weights = datagen.zipf_cum_weights(10, 1.5)
+        queries_before, sql_time_before = REQUEST_QUERIES.totals(), REQUEST_SQL_TIME.totals()
+        cache_before = post_response_cache.stats()
+
+        stop = asyncio.Event()
+        lags = []
+        probe = asyncio.create_task(probe_loop_lag(stop, 0.01, lags))
+        started = time.perf_counter()
+        deadline = started + self.duration
+        await asyncio.gather(*(self.worker(index, deadline) for index in range(self.concurrency)))
+        elapsed = time.perf_counter() - started
+        stop.set()
+        await probe
+
+        scenarios = {}
+        for scenario in self.mix:
+            latencies = self.latencies[scenario]
+            statuses = self.statuses[scenario]
+            scenarios[scenario] = {
+                "requests": len(latencies),
+                "errors": sum(count for status, count in statuses.items() if not 200 <= status < 400),
+                "statuses": {str(status): count for status, count in sorted(statuses.items())},
+                "rps": round(len(latencies) / elapsed, 1),
+                "latency_ms": latency_summary(latencies),
+            }
+
+        cache_after = post_response_cache.stats()
+        cache_hits = cache_after["hits"] - cache_before["hits"]
+        cache_misses = cache_after["misses"] - cache_before["misses"]
+        return {
+            "seconds": round(elapsed, 2),
+            "requests": sum(scenario["requests"] for scenario in scenarios.values()),
+            "rps": round(sum(scenario["requests"] for scenario in scenarios.values()) / elapsed, 1),
+            "scenarios": scenarios,
+            "routes": route_stats(REQUEST_QUERIES.totals(), queries_before, REQUEST_SQL_TIME.totals(), sql_time_before),
+            "response_cache": {
+                "hits": cache_hits,
+                "misses": cache_misses,
+                "hit_rate": round(cache_hits / (cache_hits + cache_misses), 3) if cache_hits + cache_misses else 0.0,
+            },
+            "loop_lag_ms": latency_summary(lags),
+        }
+
+    async def run_fanout(self, clients: int, posts: int, timeout: float) -> dict:
+        """
+        Подписчики самого популярного автора подключаются по websocket, автор публикует посты;
+        задержка доставки — от запроса на создание поста до получения уведомления клиентом.
+        """
+        import httpx
+        from sqlalchemy import func, select
+
+        from ..database import SessionLocal
+        from ..models import Follow
+
+        async with SessionLocal() as db:
+            author_id = await db.scalar(
+                select(Follow.followed_id).group_by(Follow.followed_id).order_by(func.count().desc()).limit(1)
+            )
+            follower_ids = (await db.scalars(
+                select(Follow.follower_id).where(Follow.followed_id == author_id).order_by(Follow.follower_id).limit(clients)
+            )).all()
+        if author_id is None or not follower_ids:
+            return {"clients": 0}
+
+        from ..auth.auth_handler import create_access_token
+
+        def token(user_id: int) -> str:
+            return self.tokens.get(user_id) or create_access_token(data={"sub": str(user_id)},
+                                                                    expires_delta=timedelta(hours=2))
+
+        sockets = [ASGIWebSocket(self.app, "/ws", f"token={token(user_id)}") for user_id in follower_ids]
+        connect_started = time.perf_counter()
+        await asyncio.gather(*(socket.connect() for socket in sockets))
+        connect_seconds = time.perf_counter() - connect_started
+
+        pending: Dict[str, dict] = {}
+
+        async def receive(socket: ASGIWebSocket):
+            try:
+                while True:
+                    message = await socket.receive_json()
+                    waiting = pending.get((message.get("notification") or {}).get("description"))
+                    if waiting is not None:
+                        waiting["latencies"].append(time.perf_counter() - waiting["started"])
+                        if len(waiting["latencies"]) == len(sockets):
+                            waiting["done"].set()
+            except ConnectionError:
+                pass
+
+        receivers = [asyncio.create_task(receive(socket)) for socket in sockets]
+        delivery, create_latencies, delivered = [], [], 0
+        transport = httpx.ASGITransport(app=self.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            for index in range(posts):
+                title = f"Bench fan-out {self.seed}-{index}-{time.time_ns()}"
+                waiting = pending[title] = {"started": time.perf_counter(), "latencies": [], "done": asyncio.Event()}
+                response = await client.post(
+                    f"/create_post_for_user/{author_id}/",
+                    json={"title": title, "body": "<p>bench</p>", "main_image": None, "tags": ["bench"],
+                          "category": "bench"},
+                    headers={"Authorization": f"Bearer {token(author_id)}"},
+                )
+                create_latencies.append(time.perf_counter() - waiting["started"])
+                response.raise_for_status()
+                try:
+                    await asyncio.wait_for(waiting["done"].wait(), timeout)
+                except asyncio.TimeoutError:
+                    pass
+                delivered += len(waiting["latencies"])
+                delivery.extend(waiting["latencies"])
+
+        await asyncio.gather(*(socket.close() for socket in sockets))
+        for receiver in receivers:
+            receiver.cancel()
+        return {
+            "author_id": author_id,
+            "clients": len(sockets),
+            "connect_seconds": round(connect_seconds, 3),
+            "posts": posts,
+            "expected": posts * len(sockets),
+            "delivered": delivered,
+            "create_post_latency_ms": latency_summary(create_latencies),
+            "delivery_latency_ms": latency_summary(delivery),
+        }
+
+
+def route_stats(queries: dict, queries_before: dict, sql_time: dict, sql_time_before: dict) -> dict:
+    # Среднее число SQL-запросов и время в SQL на запрос за прогон: разница снимков гистограмм
+    routes = {}
+    for (method, route), (total, count) in sorted(queries.items()):
+        before_total, before_count = queries_before.get((method, route), (0.0, 0))
+        if count == before_count:
+            continue
+        sql_total, _ = sql_time.get((method, route), (0.0, 0))
+        sql_before, _ = sql_time_before.get((method, route), (0.0, 0))
+        requests = count - before_count
+        routes[f"{method} {route}"] = {
+            "requests": requests,
+            "queries_per_request": round((total - before_total) / requests, 2),
+            "sql_ms_per_request": round((sql_total - sql_before) * 1000 / requests, 3),
+        }
+    return routes
+
+
+def compare(report: dict, baseline: dict) -> dict:
+    """
+    Изменение в процентах относительно другого отчёта: положительное для rps — лучше, для задержек — хуже.
+    """
+
+    def change(current, previous):
+        return round((current - previous) * 100 / previous, 1) if previous else None
+
+    comparison = {"baseline_commit": baseline.get("meta", {}).get("commit"), "scenarios": {}}
+    for scenario, current in report["http"]["scenarios"].items():
+        previous = baseline.get("http", {}).get("scenarios", {}).get(scenario)
+        if previous is None:
+            continue
+        comparison["scenarios"][scenario] = {
+            "rps_change_pct": change(current["rps"], previous["rps"]),
+            "p50_change_pct": change(current["latency_ms"]["p50"], previous["latency_ms"]["p50"]),
+            "p95_change_pct": change(current["latency_ms"]["p95"], previous["latency_ms"]["p95"]),
+            "p99_change_pct": change(current["latency_ms"]["p99"], previous["latency_ms"]["p99"]),
+        }
+    current_fanout = report.get("websocket_fanout", {}).get("delivery_latency_ms")
+    previous_fanout = baseline.get("websocket_fanout", {}).get("delivery_latency_ms")
+    if current_fanout and previous_fanout:
+        comparison["websocket_fanout"] = {"p95_change_pct": change(current_fanout["p95"], previous_fanout["p95"])}
+    return comparison
+
+
+async def dataset_counts() -> dict:
+    from sqlalchemy import func, select
+
+    from ..database import SessionLocal
+    from ..models import Follow, Notification, Post, PostComment, PostLike, PostView, User
+
+    async with SessionLocal() as db:
+        return {
+            model.__tablename__: await db.scalar(select(func.count()).select_from(model))
+            for model in (User, Post, Follow, PostView, PostLike, PostComment, Notification)
+        }
+
+
+async def run(args: argparse.Namespace, generate_options: Optional[dict]) -> dict:
+    generated = None
+    if generate_options is not None:
+        generated = await datagen.generate(**generate_options)
+
+    from ..main import app
+    from ..settings.config import settings
+
+    async with app.router.lifespan_context(app):
+        load_test = LoadTest(app, args.duration, args.concurrency, args.mix, args.seed)
+        await load_test.load_sample()
+        report = {
+            "meta": {
+                "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+                "commit": git_commit(),
+                "python": platform.python_version(),
+                "params": {
+                    "duration": args.duration, "concurrency": args.concurrency, "mix": args.mix, "seed": args.seed,
+                    "ws_clients": args.ws_clients, "fanout_posts": args.fanout_posts,
+                },
+                "settings": {
+                    "json_response": settings.JSON_RESPONSE,
+                    "compression": settings.COMPRESSION_ENABLED,
+                    "broadcast_backend": settings.BROADCAST_BACKEND,
+                    "metrics": settings.METRICS_ENABLED,
+                },
+                "dataset": await dataset_counts(),
+                "generated": generated,
+            },
+            "http": await load_test.run_http(),
+        }
+        if args.ws_clients and args.fanout_posts:
+            report["websocket_fanout"] = await load_test.run_fanout(args.ws_clients, args.fanout_posts,
+                                                                   args.fanout_timeout)
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--db-url", help="база, заполненная backend.benchmarks.datagen")
+    parser.add_argument("--duration", type=float, default=20.0, help="секунды смешанной HTTP-нагрузки")
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--mix", type=parse_mix, default=parse_mix(DEFAULT_MIX), help=f"по умолчанию {DEFAULT_MIX}")
+    parser.add_argument("--ws-clients", type=int, default=200, help="подписчиков автора, подключённых по websocket")
+    parser.add_argument("--fanout-posts", type=int, default=5)
+    parser.add_argument("--fanout-timeout", type=float, default=10.0)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", help="файл для JSON-отчёта (кроме вывода в stdout)")
+    parser.add_argument("--baseline", help="отчёт другого прогона для сравнения")
+    args = parser.parse_args()
+
+    generate_options = None
+    if args.db_url is None:
+        # Небольшой набор данных во временной базе, чтобы тест можно было запустить одной командой
+        args.db_url = f"sqlite+aiosqlite:///{os.path.join(tempfile.mkdtemp(prefix='load-bench-'), 'bench.db')}"
+        generate_options = {
+            "users": 500, "posts": 2000, "authors": 0.1, "follows_per_user": 20, "views": 50000, "likes": 10000,
+            "comments": 5000, "notifications": 10000, "seed": args.seed, "related": False,
+        }
+    # Настройки читаются при импорте модулей бэкенда, поэтому адрес базы задаётся до него
+    os.environ["DB_URL"] = args.db_url
+
+    report = asyncio.run(run(args, generate_options))
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as baseline_file:
+            report["comparison"] = compare(report, json.load(baseline_file))
+
+    output = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as output_file:
+            output_file.write(output + "\n")
+    print(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""
+Бенчмарк входа: пропускная способность /auth/token и задержка event loop при одновременных логинах.
+
+Запуск из корня репозитория:
+    python -m backend.benchmarks.login_throughput --logins 200 --concurrency 20
+
+Приложение поднимается в процессе (ASGI без сети) на временной базе (DB_URL указывает на временный файл).
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import tempfile
+import time
+
+from .common import percentile, probe_loop_lag
+
+
+async def run(logins: int, concurrency: int):
+    import httpx
+    from ..main import app
+
+    username, password = "bench_user", "bench_password"
+    latencies, lags = [], []
+
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            await client.post("/auth/register", json={"username": username, "email": "bench@example.com",
+                                                      "password": password})
+
+            semaphore = asyncio.Semaphore(concurrency)
+
+            async def login():
+                async with semaphore:
+                    started = time.perf_counter()
+                    response = await client.post("/auth/token", data={"username": username, "password": password})
+                    latencies.append(time.perf_counter() - started)
+                    response.raise_for_status()
+
+            stop = asyncio.Event()
+            probe = asyncio.create_task(probe_loop_lag(stop, 0.005, lags))
+            started = time.perf_counter()
+            await asyncio.gather(*(login() for _ in range(logins)))
+            elapsed = time.perf_counter() - started
+            stop.set()
+            await probe
+
+    return {
+        "logins": logins,
+        "concurrency": concurrency,
+        "elapsed_s": round(elapsed, 3),
+        "logins_per_s": round(logins / elapsed, 2),
+        "latency_ms": {
+            "p50": round(percentile(latencies, 0.50) * 1000, 1),
+            "p95": round(percentile(latencies, 0.95) * 1000, 1),
+            "p99": round(percentile(latencies, 0.99) * 1000, 1),
+        },
+        "loop_lag_ms": {
+            "mean": round(statistics.fmean(lags) * 1000, 2) if lags else 0.0,
+            "p99": round(percentile(lags, 0.99) * 1000, 2),
+            "max": round(max(lags, default=0.0) * 1000, 2),
+        },
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--logins", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=20)
+    args = parser.parse_args()
+
+    # Настройки читаются при импорте приложения, поэтому временная база задаётся до него
+    os.environ["DB_URL"] = f"sqlite+aiosqlite:///{os.path.join(tempfile.mkdtemp(prefix='login-bench-'), 'bench.db')}"
+    print(json.dumps(asyncio.run(run(args.logins, args.concurrency)), indent=2))
+
+
+if __name__ == "__main__":
+    main()
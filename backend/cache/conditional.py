@@ -0,0 +1,118 @@
+import hashlib
+import re
+from email.utils import parsedate_to_datetime
+from typing import Iterable, List, Optional, Tuple
+
+Headers = List[Tuple[bytes, bytes]]
+
+# Заголовки, которые не отправляются в ответе 304
+BODY_HEADERS = {b"content-length", b"content-type", b"content-encoding"}
+
+
+def make_etag(body: bytes) -> bytes:
+    # Слабый ETag: тело может быть сжато по-разному, но содержимое то же
+    return b'W/"' + hashlib.blake2b(body, digest_size=16).hexdigest().encode() + b'"'
+
+
+def get_header(headers: Iterable[Tuple[bytes, bytes]], name: bytes) -> Optional[bytes]:
+    for key, value in headers:
+        if key.lower() == name:
+            return value
+    return None
+
+
+def is_not_modified(request_headers: Headers, response_headers: Headers) -> bool:
+    """
+    Проверка условного GET: If-None-Match по ETag, а если его нет — If-Modified-Since по Last-Modified.
+    """
+    if_none_match = get_header(request_headers, b"if-none-match")
+    if if_none_match is not None:
+        etag = get_header(response_headers, b"etag")
+        if etag is None:
+            return False
+        if if_none_match.strip() == b"*":
+            return True
+        # Слабое сравнение: префикс W/ не учитывается
+        candidates = {tag.strip().removeprefix(b"W/") for tag in if_none_match.split(b",")}
+        return etag.removeprefix(b"W/") in candidates
+
+    if_modified_since = get_header(request_headers, b"if-modified-since")
+    last_modified = get_header(response_headers, b"last-modified")
+    if if_modified_since is None or last_modified is None:
+        return False
+    try:
+        return parsedate_to_datetime(last_modified.decode()) <= parsedate_to_datetime(if_modified_since.decode())
+    except (TypeError, ValueError):
+        return False
+
+
+def not_modified_headers(headers: Headers) -> Headers:
+    return [(key, value) for key, value in headers if key.lower() not in BODY_HEADERS]
+
+
+class ConditionalGetMiddleware:
+    """
+    ASGI middleware: добавляет к успешным GET-ответам ETag (хэш тела) и Cache-Control
+    и отвечает 304 без тела, если у клиента та же версия.
+    Last-Modified не выставляется: время генерации ответа не говорит, когда менялись данные
+    (лайки и просмотры меняют ответ, не меняя дат), и If-Modified-Since давал бы ложные 304.
+    Стоит внутри ResponseCacheMiddleware, поэтому ETag сохраняется в кэше вместе с ответом,
+    и повторный опрос при попадании в кэш получает 304 без обращения к базе. При промахе кэша
+    экономится только передача тела.
+    """
+
+    def __init__(self, app, paths: str, cache_control: str):
+        self.app = app
+        self.paths = re.compile(paths)
+        self.cache_control = cache_control.encode()
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] != "GET" or not self.paths.match(scope["path"]):
+            await self.app(scope, receive, send)
+            return
+
+        request_headers = scope["headers"]
+        start_message = {}
+        body_parts = []
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                start_message.update(message)
+                return
+            if message["type"] != "http.response.body":
+                await send(message)
+                return
+
+            body_parts.append(message.get("body", b""))
+            if message.get("more_body", False):
+                return
+
+            body = b"".join(body_parts)
+            headers = list(start_message.get("headers", []))
+            if start_message["status"] != 200:
+                await send(start_message)
+                await send({"type": "http.response.body", "body": body})
+                return
+
+            headers = self.add_validators(headers, body)
+            if is_not_modified(request_headers, headers):
+                await send({"type": "http.response.start", "status": 304, "headers": not_modified_headers(headers)})
+                await send({"type": "http.response.body", "body": b""})
+                return
+            await send({**start_message, "headers": headers})
+            await send({"type": "http.response.body", "body": body})
+
+        await self.app(scope, receive, send_wrapper)
+
+    def add_validators(self, headers: Headers, body: bytes) -> Headers:
+        if get_header(headers, b"etag") is None:
+            headers.append((b"etag", make_etag(body)))
+        # Персональные ответы выставляют Cache-Control сами (private), остальные считаются общими
+        if get_header(headers, b"cache-control") is None:
+            headers.append((b"cache-control", self.cache_control))
+        headers.append((b"vary", b"Authorization"))
+        return headers
+
+
+# Публичные эндпоинты чтения, которые клиенты чаще всего опрашивают повторно
+CONDITIONAL_GET_PATHS = r"^/(getpost/|get_all_posts|get_top_posts|relatedposts/|users/\d+$)"
@@ -0,0 +1,149 @@
+import re
+import time
+from collections import OrderedDict
+from typing import Iterable, Optional, Tuple
+from urllib.parse import parse_qsl
+
+from ..settings.config import settings
+from ..viewer_state import VIEWER_STATE_PARAM
+from .conditional import is_not_modified, not_modified_headers
+
+
+class ResponseCache:
+    """
+    LRU-кэш готовых ответов с TTL.
+    Ключ — путь и query-параметры запроса, значение — статус, заголовки и тело ответа.
+    Кэшируются пути с префиксами prefixes или, если задан pattern, пути, подходящие под это регулярное выражение.
+    Заголовок Authorization в ключ не входит, поэтому запросы с private_params или private_headers
+    (ответ зависит от пользователя) идут мимо кэша.
+    """
+
+    def __init__(self, prefixes: Iterable[str], ttl: float, maxsize: int, private_params: Iterable[str] = (),
+                 pattern: Optional[str] = None, private_headers: Iterable[bytes] = ()):
+        self.prefixes = tuple(prefixes)
+        self.pattern = re.compile(pattern) if pattern is not None else None
+        self.private_params = frozenset(private_params)
+        self.private_headers = frozenset(private_headers)
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self.generation = 0  # Увеличивается при каждой инвалидации
+        self._entries: "OrderedDict[str, Tuple[float, int, list, bytes]]" = OrderedDict()
+
+    def matches(self, path: str) -> bool:
+        if self.pattern is not None:
+            return self.pattern.match(path) is not None
+        return path.startswith(self.prefixes)
+
+    def is_private(self, query_string: bytes, headers: Iterable[Tuple[bytes, bytes]] = ()) -> bool:
+        if self.private_headers and any(name.lower() in self.private_headers for name, _ in headers):
+            return True
+        if not self.private_params:
+            return False
+        return any(name in self.private_params for name, _ in parse_qsl(query_string.decode("latin-1")))
+
+    @staticmethod
+    def make_key(path: str, query_string: bytes) -> str:
+        # Порядок параметров не должен влиять на ключ
+        params = sorted(part for part in query_string.decode("latin-1").split("&") if part)
+        return f"{path}?{'&'.join(params)}"
+
+    def get(self, key: str) -> Optional[Tuple[int, list, bytes]]:
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        expires_at, status, headers, body = entry
+        if expires_at < time.monotonic():
+            del self._entries[key]
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return status, headers, body
+
+    def set(self, key: str, status: int, headers: list, body: bytes, generation: int):
+        # Ответ, посчитанный до инвалидации, уже может быть устаревшим
+        if generation != self.generation:
+            return
+        self._entries[key] = (time.monotonic() + self.ttl, status, headers, body)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def invalidate(self):
+        self.generation += 1
+        self._entries.clear()
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "size": len(self._entries),
+            "maxsize": self.maxsize,
+        }
+
+
+class ResponseCacheMiddleware:
+    """
+    ASGI middleware: отдаёт GET-ответы из кэша до того, как запрос дойдёт до роутера и базы.
+    """
+
+    def __init__(self, app, cache: ResponseCache):
+        self.app = app
+        self.cache = cache
+
+    async def __call__(self, scope, receive, send):
+        if (scope["type"] != "http" or scope["method"] != "GET" or not self.cache.matches(scope["path"])
+                or self.cache.is_private(scope["query_string"], scope["headers"])):
+            await self.app(scope, receive, send)
+            return
+
+        key = self.cache.make_key(scope["path"], scope["query_string"])
+        cached = self.cache.get(key)
+        if cached is not None:
+            status, headers, body = cached
+            # Условный GET: у клиента та же версия, что и в кэше (ETag сохранён вместе с ответом)
+            if is_not_modified(scope["headers"], headers):
+                status, headers, body = 304, not_modified_headers(headers), b""
+            await send({"type": "http.response.start", "status": status,
+                        "headers": headers + [(b"x-cache", b"HIT")]})
+            await send({"type": "http.response.body", "body": body})
+            return
+
+        generation = self.cache.generation
+        start_message = {}
+        body_parts = []
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                start_message.update(message)
+                message["headers"] = list(message.get("headers", [])) + [(b"x-cache", b"MISS")]
+            elif message["type"] == "http.response.body":
+                body_parts.append(message.get("body", b""))
+                if not message.get("more_body", False) and start_message.get("status") == 200:
+                    self.cache.set(key, 200, list(start_message.get("headers", [])), b"".join(body_parts), generation)
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
+
+
+# Публичные ленты постов и поиск — самые частые анонимные запросы
+post_response_cache = ResponseCache(
+    prefixes=("/get_all_posts", "/getpost/", "/get_top_posts", "/relatedposts/", "/search", "/posts/by_tag/"),
+    ttl=settings.RESPONSE_CACHE_TTL,
+    maxsize=settings.RESPONSE_CACHE_MAXSIZE,
+    private_params=(VIEWER_STATE_PARAM,),
+)
+
+# Анонимные профили: авторизованным отдаётся email, поэтому запросы с Authorization идут мимо кэша
+profile_response_cache = ResponseCache(
+    prefixes=(),
+    pattern=r"^/users/\d+$",
+    ttl=settings.RESPONSE_CACHE_TTL,
+    maxsize=settings.RESPONSE_CACHE_MAXSIZE,
+    private_headers=(b"authorization",),
+)
@@ -0,0 +1,111 @@
+# compression.py
+import gzip
+from typing import Iterable, Optional
+
+try:
+    import brotli
+except ImportError:  # Brotli необязателен, без него ответы сжимаются только gzip
+    brotli = None
+
+
+def parse_accept_encoding(value: str) -> dict:
+    """
+    Accept-Encoding -> {кодировка: q}; кодировки с q=0 клиент явно не принимает.
+    """
+    encodings = {}
+    for part in value.split(","):
+        name, _, params = part.strip().partition(";")
+        if not name:
+            continue
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        encodings[name.strip().lower()] = quality
+    return encodings
+
+
+class CompressionMiddleware:
+    """
+    ASGI middleware: сжатие ответов brotli или gzip — в зависимости от Accept-Encoding клиента.
+    Сжимаются только ответы подходящих типов (content_types — префиксы Content-Type) и не меньше minimum_size байт;
+    уже сжатые ответы и картинки проходят как есть.
+    """
+
+    def __init__(self, app, minimum_size: int, content_types: Iterable[str], gzip_level: int, brotli_quality: int):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.content_types = tuple(content_type.encode() for content_type in content_types)
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+
+    def choose_encoding(self, scope) -> Optional[str]:
+        for key, value in scope["headers"]:
+            if key == b"accept-encoding":
+                accepted = parse_accept_encoding(value.decode("latin-1"))
+                break
+        else:
+            return None
+        if brotli is not None and accepted.get("br", 0) > 0:
+            return "br"
+        if accepted.get("gzip", accepted.get("*", 0)) > 0:
+            return "gzip"
+        return None
+
+    def compress(self, body: bytes, encoding: str) -> bytes:
+        if encoding == "br":
+            return brotli.compress(body, quality=self.brotli_quality)
+        return gzip.compress(body, compresslevel=self.gzip_level)
+
+    def is_compressible(self, headers) -> bool:
+        content_type = b""
+        for key, value in headers:
+            key = key.lower()
+            if key == b"content-encoding":
+                return False
+            if key == b"content-type":
+                content_type = value
+        return content_type.startswith(self.content_types)
+
+    async def __call__(self, scope, receive, send):
+        encoding = self.choose_encoding(scope) if scope["type"] == "http" and scope["method"] != "HEAD" else None
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start_message = {}
+        body_parts = []
+        passthrough = False
+
+        async def send_wrapper(message):
+            nonlocal passthrough
+            if message["type"] == "http.response.start":
+                start_message.update(message)
+                passthrough = (message["status"] in (204, 304)
+                               or not self.is_compressible(message.get("headers", [])))
+                if passthrough:
+                    await send(message)
+                return
+            if passthrough or message["type"] != "http.response.body":
+                await send(message)
+                return
+
+            body_parts.append(message.get("body", b""))
+            if message.get("more_body", False):
+                return
+
+            body = b"".join(body_parts)
+            headers = [(key, value) for key, value in start_message.get("headers", [])
+                       if key.lower() != b"content-length"]
+            if len(body) >= self.minimum_size:
+                body = self.compress(body, encoding)
+                headers.append((b"content-encoding", encoding.encode()))
+            headers.append((b"content-length", str(len(body)).encode()))
+            headers.append((b"vary", b"Accept-Encoding"))
+            await send({**start_message, "headers": headers})
+            await send({"type": "http.response.body", "body": body})
+
+        await self.app(scope, receive, send_wrapper)
@@ -1,19 +1,130 @@
 # database.py
-from sqlalchemy import create_engine, MetaData
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy import MetaData, event, inspect, text
+from sqlalchemy.engine import make_url
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.schema import CreateColumn
 from .models import Base
+from .search.fulltext import setup_fulltext
+from .settings.config import settings
+from .instrumentation import instrument_engine
 
-DATABASE_URL = "sqlite:///base.db"  # You can use any database here
+# Асинхронный драйвер: sqlite+aiosqlite для SQLite, postgresql+asyncpg для PostgreSQL
+DATABASE_URL = settings.DB_URL
 
-engine = create_engine(DATABASE_URL)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+def engine_options(url) -> dict:
+    options = {"echo": settings.DB_ECHO}
+    # SQLite в памяти живёт в одном соединении (StaticPool), настройки пула к нему неприменимы
+    if url.get_backend_name() == "sqlite" and url.database in (None, "", ":memory:"):
+        return options
+    # aiosqlite по умолчанию открывает соединение на каждый запрос (NullPool); пул сохраняет соединения и их PRAGMA
+    options.update(
+        poolclass=AsyncAdaptedQueuePool,
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        pool_recycle=settings.DB_POOL_RECYCLE,
+        pool_timeout=settings.DB_POOL_TIMEOUT,
+        pool_pre_ping=True,
+    )
+    return options
+
+
+engine = create_async_engine(DATABASE_URL, **engine_options(make_url(DATABASE_URL)))
+
+
+@event.listens_for(engine.sync_engine, "connect")
+def set_sqlite_pragmas(dbapi_connection, connection_record):
+    """
+    WAL позволяет читать во время записи, а busy_timeout заставляет писателя подождать блокировку
+    вместо немедленной ошибки "database is locked".
+    """
+    if engine.dialect.name != "sqlite":
+        return
+    cursor = dbapi_connection.cursor()
+    cursor.execute(f"PRAGMA journal_mode={settings.SQLITE_JOURNAL_MODE}")
+    cursor.execute(f"PRAGMA synchronous={settings.SQLITE_SYNCHRONOUS}")
+    cursor.execute(f"PRAGMA busy_timeout={int(settings.SQLITE_BUSY_TIMEOUT_MS)}")
+    cursor.execute(f"PRAGMA cache_size={int(settings.SQLITE_CACHE_SIZE)}")
+    cursor.execute(f"PRAGMA mmap_size={int(settings.SQLITE_MMAP_SIZE)}")
+    cursor.close()
+
+
+if settings.METRICS_ENABLED:
+    instrument_engine(engine)
+
+
+SessionLocal = async_sessionmaker(bind=engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
 metadata = MetaData()
 
-def get_db():
-    db = SessionLocal()
-    try:
+# Заполнение денормализованных колонок для строк, созданных до их появления
+COLUMN_BACKFILLS = {
+    ("posts", "views_count"):
+        "UPDATE posts SET views_count = (SELECT COUNT(*) FROM post_views WHERE post_views.post_id = posts.id)",
+    ("posts", "comments_count"):
+        "UPDATE posts SET comments_count = (SELECT COUNT(*) FROM postcomments WHERE postcomments.post_id = posts.id)",
+    ("users", "followers_count"):
+        "UPDATE users SET followers_count = (SELECT COUNT(*) FROM follows WHERE follows.followed_id = users.id)",
+    ("users", "following_count"):
+        "UPDATE users SET following_count = (SELECT COUNT(*) FROM follows WHERE follows.follower_id = users.id)",
+    ("users", "posts_count"):
+        "UPDATE users SET posts_count = (SELECT COUNT(*) FROM posts WHERE posts.author_id = users.id)",
+}
+
+# Подготовка данных перед созданием индекса на существующей таблице (например, удаление дублей под уникальный индекс)
+INDEX_PREPARES = {
+    "ux_post_likes_post_user": [
+        "DELETE FROM post_likes WHERE id NOT IN (SELECT MIN(id) FROM post_likes GROUP BY post_id, user_id)",
+        "UPDATE posts SET likes = (SELECT COUNT(*) FROM post_likes WHERE post_likes.post_id = posts.id)",
+    ],
+}
+
+
+def insert_ignore(model):
+    """
+    INSERT ... ON CONFLICT DO NOTHING для текущей базы: дубли по уникальным ограничениям молча пропускаются.
+    """
+    dialect = postgresql if engine.dialect.name == "postgresql" else sqlite
+    return dialect.insert(model).on_conflict_do_nothing()
+
+
+def upgrade_schema(conn):
+    """
+    Досоздать колонки и индексы, добавленные в модели после создания таблиц.
+    create_all создаёт только отсутствующие таблицы, существующие он не меняет.
+    """
+    inspector = inspect(conn)
+    existing_tables = set(inspector.get_table_names())
+    for table in Base.metadata.sorted_tables:
+        if table.name not in existing_tables:
+            continue
+
+        existing_columns = {column["name"] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name in existing_columns:
+                continue
+            column_ddl = CreateColumn(column).compile(dialect=conn.dialect)
+            conn.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {column_ddl}"))
+            backfill = COLUMN_BACKFILLS.get((table.name, column.name))
+            if backfill:
+                conn.execute(text(backfill))
+
+        existing_indexes = {index["name"] for index in inspector.get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name not in existing_indexes:
+                for statement in INDEX_PREPARES.get(index.name, []):
+                    conn.execute(text(statement))
+                index.create(conn)
+
+
+async def get_db():
+    async with SessionLocal() as db:
         yield db
-    finally:
-        db.close()
 
-Base.metadata.create_all(bind=engine)
\ No newline at end of file
+
+async def init_db():
+    async with engine.begin() as conn:
+        await conn.run_sync(upgrade_schema)
+        await conn.run_sync(Base.metadata.create_all)
+        await conn.run_sync(setup_fulltext)
@@ -0,0 +1,132 @@
+import asyncio
+import time
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable, Dict, List
+
+from sqlalchemy import select, insert, delete, func
+
+from ..database import SessionLocal
+from ..models import BroadcastEvent
+from ..settings.logging_config import logger
+
+# Сообщение для рассылки: {"user_id": получатель, "payload": данные для websocket}
+Deliver = Callable[[List[dict]], Awaitable[None]]
+
+# Сколько секунд ждать событие с пропущенным id: транзакции в Postgres могут закоммититься не в порядке id
+GAP_TIMEOUT = 10.0
+
+
+class InProcessBroadcast:
+    """
+    Рассылка в пределах одного процесса: сообщения сразу передаются локальным подключениям.
+    """
+
+    def __init__(self, deliver: Deliver):
+        self.deliver = deliver
+
+    async def start(self):
+        pass
+
+    async def stop(self):
+        pass
+
+    async def publish(self, messages: List[dict]):
+        await self.deliver(messages)
+
+
+class DatabaseBroadcast:
+    """
+    Рассылка между процессами через таблицу broadcast_events.
+    Каждый воркер записывает сообщения в общую базу и опрашивает её на новые события,
+    доставляя их своим подключениям; старые события периодически удаляются.
+    Пропущенные id (событие ещё не закоммичено) перечитываются до GAP_TIMEOUT секунд,
+    чтобы события, закоммиченные позже событий с большим id, не терялись.
+    """
+
+    def __init__(self, deliver: Deliver, poll_interval: float, retention: timedelta):
+        self.deliver = deliver
+        self.poll_interval = poll_interval
+        self.retention = retention
+        self.last_event_id = 0
+        # id, которых не было при опросе, хотя большие id уже видны -> когда пропуск замечен
+        self._gaps: Dict[int, float] = {}
+        self._task = None
+
+    async def start(self):
+        # Новый воркер получает только события, появившиеся после его запуска
+        async with SessionLocal() as db:
+            self.last_event_id = await db.scalar(select(func.max(BroadcastEvent.id))) or 0
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def publish(self, messages: List[dict]):
+        if not messages:
+            return
+        async with SessionLocal() as db:
+            await db.execute(insert(BroadcastEvent), [
+                {"user_id": message["user_id"], "payload": message["payload"]} for message in messages
+            ])
+            await db.commit()
+
+    async def poll(self):
+        condition = BroadcastEvent.id > self.last_event_id
+        if self._gaps:
+            condition = condition | BroadcastEvent.id.in_(list(self._gaps))
+        async with SessionLocal() as db:
+            events = (await db.scalars(select(BroadcastEvent).where(condition).order_by(BroadcastEvent.id))).all()
+        self.track_gaps([event.id for event in events])
+        if events:
+            await self.deliver([{"user_id": event.user_id, "payload": event.payload} for event in events])
+
+    def track_gaps(self, event_ids: List[int]):
+        now = time.monotonic()
+        for event_id in event_ids:
+            self._gaps.pop(event_id, None)
+        new_ids = {event_id for event_id in event_ids if event_id > self.last_event_id}
+        if new_ids:
+            last_event_id = max(new_ids)
+            for missing_id in range(self.last_event_id + 1, last_event_id):
+                if missing_id not in new_ids:
+                    self._gaps[missing_id] = now
+            self.last_event_id = last_event_id
+        # Откаченные транзакции и удалённые события оставляют пропуски навсегда
+        self._gaps = {event_id: noticed for event_id, noticed in self._gaps.items() if now - noticed < GAP_TIMEOUT}
+
+    async def compact(self):
+        async with SessionLocal() as db:
+            # Последнее событие не удаляется: иначе SQLite без AUTOINCREMENT начнёт выдавать id заново с 1,
+            # а воркеры с last_event_id больше новых id пропустят все новые события
+            newest_id = select(func.max(BroadcastEvent.id)).scalar_subquery()
+            await db.execute(delete(BroadcastEvent).where(
+                BroadcastEvent.date < datetime.now() - self.retention, BroadcastEvent.id < newest_id,
+            ))
+            await db.commit()
+
+    async def _run(self):
+        polls_per_compaction = max(1, int(self.retention.total_seconds() / self.poll_interval))
+        polls = 0
+        while True:
+            await asyncio.sleep(self.poll_interval)
+            try:
+                await self.poll()
+                polls += 1
+                if polls % polls_per_compaction == 0:
+                    await self.compact()
+            except Exception as e:
+                logger.error(f"Failed to poll broadcast events: {e}")
+
+
+def create_broadcast(backend: str, deliver: Deliver, poll_interval: float, retention: timedelta):
+    if backend == "memory":
+        return InProcessBroadcast(deliver)
+    if backend == "database":
+        return DatabaseBroadcast(deliver, poll_interval, retention)
+    raise ValueError(f"Unknown broadcast backend: {backend}")
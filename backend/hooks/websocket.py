@@ -1,62 +1,166 @@
-from fastapi import APIRouter, WebSocket, WebSocketDisconnect, Depends, HTTPException
-from sqlalchemy.orm import Session
+import asyncio
+from collections import defaultdict
+from datetime import timedelta
+from typing import Dict, Iterable, List, Set
+
+from fastapi import APIRouter, WebSocket, WebSocketDisconnect, HTTPException, status
+from sqlalchemy.ext.asyncio import AsyncSession
 from jwt import decode, exceptions as jwt_exceptions
-from typing import List
 from ..auth.auth_handler import SECRET_KEY, ALGORITHM
 from ..models import User, Notification
-from ..database import get_db
+from ..database import SessionLocal
+from ..schemas import NotificationResponse
+from ..settings.config import settings
+from .broadcast import create_broadcast
 from ..settings.logging_config import logger
 
 router = APIRouter()
 
-active_connections: List[WebSocket] = []
 
+class Connection:
+    """
+    Подключение пользователя с собственной ограниченной очередью отправки.
+    """
+
+    def __init__(self, websocket: WebSocket, user_id: int, queue_size: int):
+        self.websocket = websocket
+        self.user_id = user_id
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.sender: asyncio.Task = None
+
+
+class ConnectionManager:
+    """
+    Подключения, сгруппированные по id пользователя.
+    Каждое подключение отправляет сообщения в своей задаче, поэтому медленный клиент не задерживает остальных;
+    клиент, чья очередь переполнилась или отправка не уложилась в таймаут, отключается.
+    """
 
-async def notify_users_update():
-    logger.info("Notifying clients about updates")
-    disconnected_clients = []
-    for connection in active_connections:
+    def __init__(self, queue_size: int, send_timeout: float):
+        self.queue_size = queue_size
+        self.send_timeout = send_timeout
+        self.connections: Dict[int, Set[Connection]] = defaultdict(set)
+
+    @property
+    def count(self) -> int:
+        return sum(len(user_connections) for user_connections in self.connections.values())
+
+    def connect(self, websocket: WebSocket, user_id: int) -> Connection:
+        connection = Connection(websocket, user_id, self.queue_size)
+        connection.sender = asyncio.create_task(self._sender(connection))
+        self.connections[user_id].add(connection)
+        logger.info(f"Client connected. Active connections: {self.count}")
+        return connection
+
+    def disconnect(self, connection: Connection):
+        user_connections = self.connections.get(connection.user_id)
+        if user_connections is None or connection not in user_connections:
+            return
+        user_connections.discard(connection)
+        if not user_connections:
+            del self.connections[connection.user_id]
+        connection.sender.cancel()
+        logger.warning(f"Client disconnected. Active connections: {self.count}")
+
+    def send(self, user_id: int, message: dict):
+        for connection in list(self.connections.get(user_id, ())):
+            try:
+                connection.queue.put_nowait(message)
+            except asyncio.QueueFull:
+                logger.warning(f"Evicting slow websocket client of user {user_id}: send queue is full")
+                self._evict(connection)
+
+    def _evict(self, connection: Connection):
+        self.disconnect(connection)
+        asyncio.create_task(self._close(connection.websocket))
+
+    @staticmethod
+    async def _close(websocket: WebSocket):
         try:
-            logger.debug(f"Sending notification to {connection}")
-            await connection.send_json({"update": True})
-        except Exception as e:
-            logger.error(f"Failed to notify client: {e}")
-            disconnected_clients.append(connection)
+            await websocket.close(code=status.WS_1013_TRY_AGAIN_LATER)
+        except Exception:
+            pass
 
-    for client in disconnected_clients:
-        active_connections.remove(client)
-        logger.warning(f"Removed disconnected client. Remaining: {len(active_connections)}")
+    async def _sender(self, connection: Connection):
+        while True:
+            message = await connection.queue.get()
+            try:
+                await asyncio.wait_for(connection.websocket.send_json(message), timeout=self.send_timeout)
+            except Exception as e:
+                logger.error(f"Failed to notify client of user {connection.user_id}: {e}")
+                self._evict(connection)
+                return
 
 
+manager = ConnectionManager(queue_size=settings.WS_SEND_QUEUE_SIZE, send_timeout=settings.WS_SEND_TIMEOUT)
 
 
-def get_current_user_from_token(token: str, db: Session):
+def notification_message(notification: Notification) -> dict:
+    # "update" оставлен для клиентов, которые по нему перезапрашивают список уведомлений
+    return {
+        "update": True,
+        "notification": NotificationResponse.model_validate(notification, from_attributes=True).model_dump(mode="json"),
+    }
+
+
+async def deliver_messages(messages: List[dict]):
+    # Получатели без подключений к этому процессу просто пропускаются
+    for message in messages:
+        manager.send(message["user_id"], message["payload"])
+
+
+broadcast = create_broadcast(
+    settings.BROADCAST_BACKEND,
+    deliver_messages,
+    poll_interval=settings.BROADCAST_POLL_INTERVAL,
+    retention=timedelta(seconds=settings.BROADCAST_RETENTION_SECONDS),
+)
+
+
+async def notify_users_update(notifications: Iterable[Notification]):
+    """
+    Отправить уведомления по websocket только их получателям, в том числе подключённым к другим воркерам.
+    """
+    messages = [
+        {"user_id": notification.user_id, "payload": notification_message(notification)}
+        for notification in notifications
+    ]
+    logger.info(f"Notifying clients about {len(messages)} notifications")
+    await broadcast.publish(messages)
+
+
+async def get_current_user_from_token(token: str, db: AsyncSession):
     """
     Проверить и декодировать токен, получить текущего пользователя.
     """
     try:
         payload = decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        username: str = payload.get("sub")
-        if not username:
+        user_id = payload.get("sub")  # В токене хранится id пользователя
+        if not user_id:
             raise HTTPException(status_code=401, detail="Invalid token payload")
-        user = db.query(User).filter(User.username == username).first()
+        user = await db.get(User, int(user_id))
         if not user:
             raise HTTPException(status_code=401, detail="User not found")
         return user
-    except jwt_exceptions.InvalidTokenError:
+    except (jwt_exceptions.InvalidTokenError, ValueError):
         raise HTTPException(status_code=401, detail="Invalid token")
 
 
 @router.websocket("/ws")
 async def websocket_endpoint(websocket: WebSocket, token: str):
+    async with SessionLocal() as db:
+        try:
+            user = await get_current_user_from_token(token, db)
+        except HTTPException:
+            await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+            return
+
     await websocket.accept()
-    active_connections.append(websocket)
-    logger.info(f"Client connected. Active connections: {len(active_connections)}")
+    connection = manager.connect(websocket, user.id)
     try:
         while True:
             await websocket.receive_text()  # Ожидание сообщений от клиента
     except WebSocketDisconnect:
-        active_connections.remove(websocket)
-        logger.warning(f"Client disconnected. Active connections: {len(active_connections)}")
-
-
+        pass
+    finally:
+        manager.disconnect(connection)
@@ -0,0 +1,211 @@
+# instrumentation.py
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from sqlalchemy import event
+from starlette.routing import Match
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+
+def format_labels(names: Sequence[str], values: Sequence) -> str:
+    if not names:
+        return ""
+    escaped = (str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for value in values)
+    return "{" + ",".join(f'{name}="{value}"' for name, value in zip(names, escaped)) + "}"
+
+
+class Counter:
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[tuple, float] = {}
+
+    def inc(self, labels: tuple = (), amount: float = 1.0):
+        self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        for labels, value in sorted(self._values.items()):
+            lines.append(f"{self.name}{format_labels(self.labelnames, labels)} {value}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str], buckets: Sequence[float]):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        # labels -> [счётчики по корзинам (не накопительные), сумма, количество]
+        self._series: Dict[tuple, list] = {}
+
+    def observe(self, labels: tuple, value: float):
+        series = self._series.get(labels)
+        if series is None:
+            series = self._series[labels] = [[0] * len(self.buckets), 0.0, 0]
+        index = bisect_left(self.buckets, value)
+        if index < len(self.buckets):
+            series[0][index] += 1
+        series[1] += value
+        series[2] += 1
+
+    def totals(self) -> Dict[tuple, Tuple[float, int]]:
+        # labels -> (сумма, количество); разница двух снимков даёт среднее за интервал (например, за прогон бенчмарка)
+        return {labels: (total, count) for labels, (_, total, count) in self._series.items()}
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        names = self.labelnames + ("le",)
+        for labels, (bucket_counts, total, count) in sorted(self._series.items()):
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, bucket_counts):
+                cumulative += bucket_count
+                lines.append(f"{self.name}_bucket{format_labels(names, labels + (bound,))} {cumulative}")
+            lines.append(f"{self.name}_bucket{format_labels(names, labels + ('+Inf',))} {count}")
+            lines.append(f"{self.name}_sum{format_labels(self.labelnames, labels)} {total}")
+            lines.append(f"{self.name}_count{format_labels(self.labelnames, labels)} {count}")
+        return lines
+
+
+class CallbackMetric:
+    """
+    Метрика, значение которой считывается в момент запроса /metrics: callback возвращает {labels: value}.
+    Так выставляются счётчики, которые уже ведут сами объекты (кэши, менеджер websocket-подключений).
+    """
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str],
+                 callback: Callable[[], Dict[tuple, float]], kind: str = "gauge"):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.callback = callback
+        self.kind = kind
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        for labels, value in sorted(self.callback().items()):
+            lines.append(f"{self.name}{format_labels(self.labelnames, labels)} {value}")
+        return lines
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics: Dict[str, object] = {}
+
+    def register(self, metric):
+        # Повторная регистрация (например, при перезагрузке модуля) заменяет метрику
+        self._metrics[metric.name] = metric
+        return metric
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+metrics = MetricsRegistry()
+
+REQUEST_LATENCY = metrics.register(Histogram(
+    "http_request_duration_seconds", "HTTP request latency.", ("method", "route", "status"), LATENCY_BUCKETS,
+))
+REQUEST_QUERIES = metrics.register(Histogram(
+    "http_request_db_queries", "SQL statements executed per HTTP request.", ("method", "route"), QUERY_COUNT_BUCKETS,
+))
+REQUEST_SQL_TIME = metrics.register(Histogram(
+    "http_request_db_seconds", "Time spent in SQL per HTTP request.", ("method", "route"), LATENCY_BUCKETS,
+))
+DB_QUERIES = metrics.register(Counter(
+    "db_queries_total", "SQL statements executed, including background workers.",
+))
+DB_QUERY_TIME = metrics.register(Counter(
+    "db_query_seconds_total", "Time spent in SQL, including background workers.",
+))
+
+
+class RequestStats:
+    __slots__ = ("queries", "sql_time")
+
+    def __init__(self):
+        self.queries = 0
+        self.sql_time = 0.0
+
+
+# Счётчики текущего запроса; события движка выполняются в контексте той же задачи
+current_request_stats: ContextVar[Optional[RequestStats]] = ContextVar("current_request_stats", default=None)
+
+
+def instrument_engine(engine):
+    """
+    Подписка на события движка: число и длительность SQL-запросов, общие и в рамках HTTP-запроса.
+    """
+    sync_engine = getattr(engine, "sync_engine", engine)
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info["query_started"].pop()
+        DB_QUERIES.inc()
+        DB_QUERY_TIME.inc(amount=elapsed)
+        stats = current_request_stats.get()
+        if stats is not None:
+            stats.queries += 1
+            stats.sql_time += elapsed
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware: задержка HTTP-запросов по шаблону маршрута, число SQL-запросов и время в SQL на запрос.
+    Метка route — шаблон пути (/getpost/{slug:path}/), а не сам путь, чтобы число рядов не росло с числом постов.
+    """
+
+    def __init__(self, app, routes: Iterable, excluded_paths: Iterable[str] = ()):
+        self.app = app
+        self.routes = routes
+        self.excluded_paths = frozenset(excluded_paths)
+
+    def route_template(self, scope) -> str:
+        route = scope.get("route")
+        if route is not None:
+            return route.path
+        # Ответ из кэша не доходит до роутера — ищем маршрут сами
+        for route in self.routes:
+            match, _ = route.matches(scope)
+            if match == Match.FULL:
+                return route.path
+        return "unmatched"
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] in self.excluded_paths:
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats()
+        token = current_request_stats.set(stats)
+        status_code = 500
+        started = time.perf_counter()
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - started
+            current_request_stats.reset(token)
+            route = self.route_template(scope)
+            method = scope["method"]
+            REQUEST_LATENCY.observe((method, route, str(status_code)), elapsed)
+            REQUEST_QUERIES.observe((method, route), stats.queries)
+            REQUEST_SQL_TIME.observe((method, route), stats.sql_time)
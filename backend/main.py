@@ -1,4 +1,6 @@
 # main.py
+from contextlib import asynccontextmanager
+
 import uvicorn
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
@@ -7,28 +9,89 @@ from backend.routers import auth
 from backend.routers import user
 from backend.routers import posts
 from backend.routers import notifications
-from backend.hooks.websocket import router as websocket_router
+from backend.routers import images
+from backend.routers import search
+from backend.routers import metrics
+from backend.hooks.websocket import router as websocket_router, broadcast
+from backend.database import engine
+from backend.migrate import migrate
+from backend.settings.config import settings
+from backend.pagination import NEXT_CURSOR_HEADER
+from backend.cache.response_cache import ResponseCacheMiddleware, post_response_cache, profile_response_cache
+from backend.cache.conditional import ConditionalGetMiddleware, CONDITIONAL_GET_PATHS
+from backend.compression import CompressionMiddleware
+from backend.responses import json_response_class
+from backend.instrumentation import MetricsMiddleware
+from backend.workers.view_ingestion import view_ingestion
+from backend.workers.leaderboard import leaderboard
+from backend.workers.fanout import follower_fanout
+from backend.workers.related_posts import related_posts_indexer
+from backend.workers.notification_retention import notification_retention
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if settings.DB_AUTO_MIGRATE:
+        await migrate()
+    await view_ingestion.start()
+    await leaderboard.start()
+    await broadcast.start()
+    await follower_fanout.start()
+    await related_posts_indexer.start()
+    await notification_retention.start()
+    yield
+    await notification_retention.stop()
+    await related_posts_indexer.stop()
+    await follower_fanout.stop()
+    await broadcast.stop()
+    await leaderboard.stop()
+    await view_ingestion.stop()
+    await engine.dispose()
 
-app = FastAPI(debug=True)
+
+app = FastAPI(debug=True, lifespan=lifespan, default_response_class=json_response_class())
 
 origins = [
     "http://localhost:5173",
     # Add more origins here
 ]
 
+# ETag считается один раз при генерации ответа и сохраняется в кэше вместе с ним
+app.add_middleware(ConditionalGetMiddleware, paths=CONDITIONAL_GET_PATHS, cache_control=settings.HTTP_CACHE_CONTROL)
+# Кэш добавляется раньше CORS, чтобы CORS-заголовки выставлялись поверх закэшированного ответа
+app.add_middleware(ResponseCacheMiddleware, cache=post_response_cache)
+app.add_middleware(ResponseCacheMiddleware, cache=profile_response_cache)
+# Сжатие снаружи кэша: в кэше лежит несжатый ответ, кодировка выбирается под каждого клиента
+if settings.COMPRESSION_ENABLED:
+    app.add_middleware(
+        CompressionMiddleware,
+        minimum_size=settings.COMPRESSION_MINIMUM_SIZE,
+        content_types=settings.COMPRESSION_CONTENT_TYPES,
+        gzip_level=settings.COMPRESSION_GZIP_LEVEL,
+        brotli_quality=settings.COMPRESSION_BROTLI_QUALITY,
+    )
 app.add_middleware(
     CORSMiddleware,
     allow_origins=origins,
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER],
 )
 
 app.include_router(user.router)
 app.include_router(auth.router, prefix="/auth")
 app.include_router(posts.router)
 app.include_router(notifications.router)
+app.include_router(images.router)
+app.include_router(search.router)
 app.include_router(websocket_router)
 
+if settings.METRICS_ENABLED:
+    app.include_router(metrics.router)
+    # Добавляется последним, то есть снаружи остальных middleware: время запроса считается целиком,
+    # включая ответы из кэша и сжатие
+    app.add_middleware(MetricsMiddleware, routes=app.router.routes, excluded_paths=("/metrics",))
+
 if __name__ == "__main__":
     uvicorn.run(app, host="0.0.0.0", port=8000)
@@ -0,0 +1,24 @@
+"""
+Создание и обновление схемы базы и перенос данных.
+
+Запуск из корня репозитория (нужен, если DB_AUTO_MIGRATE=False, например при нескольких воркерах):
+    python -m backend.migrate
+"""
+import asyncio
+
+from .database import init_db, engine
+from .storage.migrations import migrate_inline_images
+
+
+async def migrate():
+    await init_db()
+    await migrate_inline_images()
+
+
+async def main():
+    await migrate()
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -1,7 +1,9 @@
 # models.py
-from sqlalchemy import Column, Integer, String, Boolean, ForeignKey, DateTime, UniqueConstraint, ARRAY, JSON
+from sqlalchemy import Column, Integer, String, Boolean, ForeignKey, DateTime, UniqueConstraint, ARRAY, JSON, Index, Float, \
+    func
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import relationship
+from sqlalchemy.orm import relationship, column_property
+from sqlalchemy.sql import expression
 from datetime import datetime
 import slugify
 import uuid  # Добавляем импорт для uuid
@@ -22,6 +24,10 @@ class User(Base):
     followers = relationship("Follow", foreign_keys='Follow.followed_id', back_populates="followed")
     following = relationship("Follow", foreign_keys='Follow.follower_id', back_populates="follower")
     profile_image = Column(String, nullable=True)  # profile image
+    # Денормализованные счётчики, меняются атомарно при подписке/отписке и публикации поста
+    followers_count = Column(Integer, default=0, server_default="0", nullable=False)
+    following_count = Column(Integer, default=0, server_default="0", nullable=False)
+    posts_count = Column(Integer, default=0, server_default="0", nullable=False)
 
 
 class Post(Base):
@@ -30,6 +36,8 @@ class Post(Base):
     id = Column(Integer, primary_key=True, index=True)
     title = Column(String, index=True)
     body = Column(String)
+    # Начало текста для превью в списках, чтобы не загружать тело поста целиком
+    excerpt_source = column_property(func.substr(body, 1, 600), deferred=True)
     date = Column(DateTime, default=datetime.now, nullable=False)  # Добавление даты
     author_id = Column(Integer, ForeignKey("users.id"))
     author = relationship("User", back_populates="posts")
@@ -39,19 +47,58 @@ class Post(Base):
     slug = Column(String, unique=True, index=True)  # Уникальная ссылка (slug)
     main_image = Column(String, nullable=True)  # Главная картинка (URL или путь к изображению)
     likes = Column(Integer, default=0)  # Количество лайков
+    views_count = Column(Integer, default=0, server_default="0", nullable=False)  # Количество просмотров
+    comments_count = Column(Integer, default=0, server_default="0", nullable=False)  # Количество комментариев
     comments = relationship("PostComment", back_populates="post")  # Связь с отзывами
     liked_by = relationship("PostLike", back_populates="post")
 
     views = relationship("PostView", back_populates="post", cascade="all, delete-orphan")
 
+    __table_args__ = (
+        Index("ix_posts_date_id", "date", "id"),  # Лента постов по курсору
+        Index("ix_posts_author_date_id", "author_id", "date", "id"),  # Посты автора по курсору
+    )
+
     @staticmethod
     def generate_slug():
         current_date = datetime.now().strftime("%d/%m/%y")  # Форматируем текущую дату
         return f"{current_date}/{str(uuid.uuid4())[:32]}"  # Генерируем уникальный slug
 
-    @property
-    def views_count(self):
-        return len(self.views)  # Возвращает количество связанных записей
+
+class PostTag(Base):
+    """
+    Нормализованные теги постов (дублируют Post.tags для поиска по индексу).
+    """
+    __tablename__ = "post_tags"
+
+    post_id = Column(Integer, ForeignKey("posts.id", ondelete="CASCADE"), primary_key=True)
+    tag = Column(String, primary_key=True)
+
+    __table_args__ = (
+        Index("ix_post_tags_tag_post", "tag", "post_id"),
+    )
+
+    @staticmethod
+    def normalize(tags):
+        # Одинаковые теги в разном регистре и с пробелами считаются одним тегом
+        return sorted({tag.strip().lower() for tag in tags or [] if isinstance(tag, str) and tag.strip()})
+
+
+class RelatedPost(Base):
+    """
+    Предрасчитанные похожие посты по пересечению тегов (коэффициент Жаккара).
+    """
+    __tablename__ = "related_posts"
+
+    id = Column(Integer, primary_key=True)
+    post_id = Column(Integer, ForeignKey("posts.id", ondelete="CASCADE"), nullable=False)
+    related_post_id = Column(Integer, ForeignKey("posts.id", ondelete="CASCADE"), nullable=False)
+    score = Column(Float, nullable=False)
+
+    __table_args__ = (
+        UniqueConstraint("post_id", "related_post_id", name="unique_related_post"),
+        Index("ix_related_posts_post_score", "post_id", "score"),
+    )
 
 
 class PostView(Base):
@@ -64,6 +111,12 @@ class PostView(Base):
 
     post = relationship("Post", back_populates="views")
 
+    __table_args__ = (
+        Index("ix_post_views_post_ip_timestamp", "post_id", "ip_address", "timestamp"),
+        Index("ix_post_views_timestamp", "timestamp"),  # Окна рейтинга популярных постов
+    )
+
+
 
 class PostComment(Base):
     __tablename__ = "postcomments"
@@ -77,6 +130,10 @@ class PostComment(Base):
     post = relationship("Post", back_populates="comments")
     author = relationship("User")
 
+    __table_args__ = (
+        Index("ix_postcomments_post_date", "post_id", "date", "id"),  # Комментарии поста по курсору
+    )
+
 
 class PostLike(Base):
     __tablename__ = "post_likes"
@@ -87,6 +144,12 @@ class PostLike(Base):
     post = relationship("Post", back_populates="liked_by")
     user = relationship("User", back_populates="liked_posts")
 
+    __table_args__ = (
+        # Один лайк на пользователя: повторный лайк отсекается базой, а не проверкой в коде
+        Index("ux_post_likes_post_user", "post_id", "user_id", unique=True),
+        Index("ix_post_likes_user_post", "user_id", "post_id"),  # Статус лайков для пачки постов
+    )
+
 
 class Follow(Base):
     __tablename__ = "follows"
@@ -100,6 +163,9 @@ class Follow(Base):
 
     __table_args__ = (
         UniqueConstraint('follower_id', 'followed_id', name='unique_follow'),
+        Index("ix_follows_followed_follower", "followed_id", "follower_id"),  # Подписчики автора
+        Index("ix_follows_followed_date", "followed_id", "date", "id"),  # Список подписчиков по курсору
+        Index("ix_follows_follower_date", "follower_id", "date", "id"),  # Список подписок по курсору
     )
 
 
@@ -111,5 +177,25 @@ class Notification(Base):
     description = Column(String)
     link = Column(String)
     date = Column(DateTime, default=datetime.now)
+    is_read = Column(Boolean, default=False, server_default=expression.false(), nullable=False)
 
     user = relationship("User")
+
+    __table_args__ = (
+        Index("ix_notifications_user_date", "user_id", "date", "id"),  # Лента уведомлений по курсору
+        Index("ix_notifications_user_read", "user_id", "is_read"),  # Счётчик непрочитанных
+    )
+
+
+class BroadcastEvent(Base):
+    """
+    Событие для рассылки websocket-уведомлений между воркерами.
+    """
+    __tablename__ = "broadcast_events"
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, nullable=False)
+    payload = Column(JSON, nullable=False)
+    date = Column(DateTime, default=datetime.now, index=True)
+
+    # id не переиспользуются после удаления старых событий: воркеры читают события по возрастанию id
+    __table_args__ = {"sqlite_autoincrement": True}
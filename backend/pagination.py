@@ -0,0 +1,42 @@
+# pagination.py
+import base64
+from datetime import datetime
+from typing import Optional, Sequence, Tuple
+
+from fastapi import HTTPException, Response
+from sqlalchemy import tuple_
+
+# Заголовок, в котором клиент получает курсор следующей страницы
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def encode_cursor(date: datetime, id: int) -> str:
+    raw = f"{date.isoformat()}|{id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        date, id = raw.split("|")
+        return datetime.fromisoformat(date), int(id)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def paginate(query, date_column, id_column, count: int, cursor: Optional[str] = None, page: int = 1):
+    """
+    Сортировка от новых к старым по (date, id) и выборка одной страницы.
+    С курсором берутся строки строго после него (keyset), без курсора — старое смещение по page.
+    """
+    query = query.order_by(date_column.desc(), id_column.desc()).limit(count)
+    if cursor:
+        return query.where(tuple_(date_column, id_column) < decode_cursor(cursor))
+    return query.offset((page - 1) * count)
+
+
+def set_next_cursor(response: Response, items: Sequence, count: int):
+    # Неполная страница — последняя, курсор не нужен
+    if len(items) == count:
+        last = items[-1]
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(last.date, last.id)
@@ -0,0 +1,27 @@
+# responses.py
+from fastapi import Response
+from fastapi.responses import JSONResponse, ORJSONResponse
+
+from .settings.config import settings
+
+try:
+    import orjson
+except ImportError:  # orjson необязателен, без него остаётся стандартный json
+    orjson = None
+
+
+def json_response_class():
+    """
+    Класс ответа по умолчанию: ORJSONResponse кодирует в несколько раз быстрее стандартного json.
+    """
+    if settings.JSON_RESPONSE == "orjson" and orjson is not None:
+        return ORJSONResponse
+    return JSONResponse
+
+
+def json_items_response(content, response: Response) -> Response:
+    """
+    Ответ из данных, уже приведённых к JSON-типам (model_dump(mode="json")), минуя jsonable_encoder.
+    Заголовки, выставленные эндпоинтом в response (курсор, Cache-Control), переносятся в ответ.
+    """
+    return json_response_class()(content, headers=dict(response.headers))
@@ -0,0 +1,37 @@
+from typing import Optional
+
+from fastapi import APIRouter, HTTPException, Request, Query, Response
+from fastapi.responses import FileResponse
+
+from ..storage.images import image_store, IMAGE_NAME_RE, CONTENT_TYPES
+
+router = APIRouter()
+
+# Содержимое файла не меняется никогда: имя и есть хэш данных
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+
+@router.get("/images/{name}")
+async def get_image(name: str, request: Request, w: Optional[int] = Query(None, ge=1, le=4096)):
+    """
+    Отдать изображение из хранилища. Параметр `w` выбирает миниатюру не уже указанной ширины.
+    Поддерживаются If-None-Match и Range.
+    """
+    if not IMAGE_NAME_RE.match(name):
+        raise HTTPException(status_code=404, detail="Image not found")
+
+    digest, extension = name.split(".")
+    path, etag, media_type = image_store.path_for(name), f'"{digest}"', CONTENT_TYPES[extension]
+    if w is not None:
+        thumbnail = image_store.thumbnail_for(name, w)
+        if thumbnail is not None:
+            path, etag, media_type = thumbnail, f'"{thumbnail.stem}"', "image/webp"
+
+    if not path.exists():
+        raise HTTPException(status_code=404, detail="Image not found")
+
+    headers = {"ETag": etag, "Cache-Control": IMMUTABLE_CACHE_CONTROL}
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and (if_none_match.strip() == "*" or etag in [tag.strip() for tag in if_none_match.split(",")]):
+        return Response(status_code=304, headers=headers)
+    return FileResponse(path, media_type=media_type, headers=headers)
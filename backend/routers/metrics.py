@@ -0,0 +1,42 @@
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+
+from ..auth.auth_handler import principal_cache, token_cache
+from ..cache.response_cache import post_response_cache, profile_response_cache
+from ..hooks.websocket import manager
+from ..instrumentation import metrics, CallbackMetric
+
+router = APIRouter()
+
+CACHES = {
+    "post_response": post_response_cache,
+    "profile_response": profile_response_cache,
+    "principal": principal_cache,
+    "token": token_cache,
+}
+
+metrics.register(CallbackMetric(
+    "websocket_connections", "Open websocket connections.", (),
+    lambda: {(): manager.count},
+))
+metrics.register(CallbackMetric(
+    "websocket_connected_users", "Users with at least one open websocket connection.", (),
+    lambda: {(): len(manager.connections)},
+))
+metrics.register(CallbackMetric(
+    "cache_requests_total", "Cache lookups by result; hit rate = hit / (hit + miss).", ("cache", "result"),
+    lambda: {
+        labels: value
+        for name, cache in CACHES.items()
+        for labels, value in (((name, "hit"), cache.hits), ((name, "miss"), cache.misses))
+    },
+    kind="counter",
+))
+
+
+@router.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+async def get_metrics():
+    """
+    Метрики в текстовом формате Prometheus.
+    """
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
@@ -1,9 +1,12 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from datetime import datetime
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from sqlalchemy import select, delete, update, func
+from sqlalchemy.ext.asyncio import AsyncSession
 from ..database import get_db
-from ..schemas import NotificationResponse, NotificationBase
+from ..schemas import NotificationResponse, NotificationBase, NotificationsMarkRead, UnreadCountResponse
 from ..models import Notification, User
-from typing import List
+from ..pagination import paginate, set_next_cursor
+from typing import List, Optional
 from ..auth.auth_handler import get_current_active_user
 from ..hooks.websocket import notify_users_update
 
@@ -13,41 +16,95 @@ router = APIRouter()
 
 @router.get("/get_notifications/", response_model=List[NotificationResponse])
 async def get_notifications(
+        response: Response,
+        count: int = Query(50, ge=1, le=200),
+        cursor: Optional[str] = None,
+        since: Optional[datetime] = None,
+        since_id: Optional[int] = None,
+        unread_only: bool = False,
         current_user: User = Depends(get_current_active_user),
-        db: Session = Depends(get_db)
+        db: AsyncSession = Depends(get_db)
 ):
     """
-    Получить уведомления для текущего пользователя.
+    Получить уведомления для текущего пользователя, от новых к старым, постранично.
+    cursor — продолжение из заголовка X-Next-Cursor; since_id — только уведомления, созданные после
+    уведомления с этим id (клиент передаёт id самого свежего уже полученного уведомления);
+    since — то же по дате, но уведомление, записанное чуть позже с более ранней датой, будет пропущено.
     """
-    # Получаем уведомления для текущего пользователя
-    notifications = db.query(Notification).filter(
-        Notification.user_id == current_user.id
-    ).order_by(Notification.date.desc()).all()
+    query = select(Notification).where(Notification.user_id == current_user.id)
+    if since_id is not None:
+        query = query.where(Notification.id > since_id)
+    if since is not None:
+        query = query.where(Notification.date > since)
+    if unread_only:
+        query = query.where(Notification.is_read.is_(False))
+
+    notifications = (await db.scalars(
+        paginate(query, Notification.date, Notification.id, count, cursor)
+    )).all()
+    set_next_cursor(response, notifications, count)
 
     return notifications
 
 
+@router.get("/notifications/unread_count", response_model=UnreadCountResponse)
+async def get_unread_count(
+        current_user: User = Depends(get_current_active_user),
+        db: AsyncSession = Depends(get_db)
+):
+    """
+    Количество непрочитанных уведомлений (покрывается индексом user_id, is_read).
+    """
+    unread = await db.scalar(
+        select(func.count())
+        .select_from(Notification)
+        .where(Notification.user_id == current_user.id, Notification.is_read.is_(False))
+    )
+    return {"unread": unread}
+
+
+@router.post("/notifications/mark_read", response_model=UnreadCountResponse)
+async def mark_notifications_read(
+        data: NotificationsMarkRead,
+        current_user: User = Depends(get_current_active_user),
+        db: AsyncSession = Depends(get_db)
+):
+    """
+    Отметить уведомления прочитанными: переданные id или все сразу.
+    """
+    query = (
+        update(Notification)
+        .where(Notification.user_id == current_user.id, Notification.is_read.is_(False))
+        .values(is_read=True)
+    )
+    if data.ids is not None:
+        query = query.where(Notification.id.in_(data.ids))
+    await db.execute(query)
+    await db.commit()
+    return await get_unread_count(current_user, db)
+
+
 @router.delete("/clear_notifications", status_code=204)
 async def clear_notifications(
     current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """
     Удалить все уведомления текущего пользователя.
     """
-    db.query(Notification).filter(Notification.user_id == current_user.id).delete()
-    db.commit()
+    await db.execute(delete(Notification).where(Notification.user_id == current_user.id))
+    await db.commit()
     return {"message": "Notifications cleared successfully"}
 
 
 @router.post("/create_notification/")
 async def create_notification(
     notification_data: NotificationBase,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_active_user)
 ):
     notification = Notification(**notification_data.dict(), user_id=current_user.id)
     db.add(notification)
-    db.commit()
-    await notify_users_update()
+    await db.commit()
+    await notify_users_update([notification])
     return notification
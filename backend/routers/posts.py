@@ -1,104 +1,236 @@
-from fastapi import APIRouter, Depends, HTTPException, Request, Query
-from sqlalchemy.orm import Session
-from typing import List
-from ..models import Post, User, PostComment, PostLike, Follow, Notification, PostView
-from ..schemas import PostCreate, PostResponse, CommentCreate, PostCommentBase
-from ..database import get_db
+from fastapi import APIRouter, Depends, HTTPException, Request, Query, Response
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload, joinedload, load_only, noload
+from typing import List, Optional, Literal, Set
+from ..models import Post, User, PostComment, PostLike, PostTag, RelatedPost
+from ..schemas import PostCreate, PostResponse, CommentCreate, PostCommentBase, PostListItem, make_excerpt, \
+    LikeResponse, LikesStatusResponse
+from ..database import get_db, insert_ignore
+from ..settings.config import settings
+from ..pagination import paginate, set_next_cursor
+from ..viewer_state import VIEWER_STATE_PARAM, add_viewer_state, liked_post_ids
+from ..responses import json_items_response
 from .user import get_current_active_user
-from datetime import datetime, timedelta
-from ..hooks.websocket import notify_users_update
-from async_lru import alru_cache
-from sqlalchemy import func
+from datetime import datetime
+from ..cache.response_cache import post_response_cache, profile_response_cache
+from ..workers.view_ingestion import view_ingestion
+from ..workers.leaderboard import leaderboard
+from ..workers.fanout import follower_fanout
+from ..workers.related_posts import related_posts_indexer
+from ..storage.images import image_store, image_url
+from sqlalchemy import select, update, delete
+from sqlalchemy.exc import IntegrityError
 
 # Создайте отдельный роутер для постов
 router = APIRouter()
 
+RELATED_POSTS_COUNT = settings.RELATED_POSTS_COUNT
+
+
+def post_response_options():
+    """
+    Опции загрузки связей, которые сериализует PostResponse.
+    AsyncSession не умеет ленивую загрузку, поэтому связи подгружаются заранее:
+    автор — в том же запросе, комментарии и их авторы — по одному запросу на всю страницу.
+    """
+    return (
+        joinedload(Post.author),
+        selectinload(Post.comments).joinedload(PostComment.author),
+    )
+
+
+def post_list_options():
+    """
+    Опции загрузки для списков постов: только колонки, нужные PostListItem, без тела и комментариев.
+    """
+    return (
+        load_only(
+            Post.id, Post.title, Post.slug, Post.excerpt_source, Post.date, Post.main_image, Post.author_id,
+            Post.likes, Post.views_count, Post.comments_count, Post.tags, Post.category,
+        ),
+        joinedload(Post.author).load_only(User.id, User.username, User.profile_image),
+    )
+
+
+def post_list_fields(
+        fields: Optional[str] = Query(None, description="Поля PostListItem через запятую, по умолчанию все"),
+) -> Optional[Set[str]]:
+    if not fields:
+        return None
+    selected = {field.strip() for field in fields.split(",") if field.strip()}
+    unknown = selected - set(PostListItem.model_fields)
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(sorted(unknown))}")
+    return selected
+
+
+def feed_viewer(
+        response: Response,
+        with_viewer_state: bool = Query(False, alias=VIEWER_STATE_PARAM,
+                                        description="Добавить в посты is_liked и is_following_author"),
+        current_user: Optional[User] = Depends(get_current_active_user),
+) -> Optional[User]:
+    """
+    Пользователь, для которого в ленту добавляются персональные флаги, или None.
+    Такие ответы не кэшируются ни у нас (см. ResponseCache.private_params), ни у клиентов.
+    """
+    if not with_viewer_state:
+        return None
+    if current_user is None:
+        raise HTTPException(status_code=401, detail="Not authenticated")
+    response.headers["Cache-Control"] = "private, no-store"
+    return current_user
+
+
+def project_posts(posts, fields: Optional[Set[str]]) -> List[dict]:
+    return [PostListItem.model_validate(post).model_dump(mode="json", include=fields) for post in posts]
+
+
+async def feed_response(db: AsyncSession, response: Response, posts, fields: Optional[Set[str]],
+                        viewer: Optional[User]) -> Response:
+    """
+    Ответ ленты: срез полей, флаги текущего пользователя и кодирование без повторного обхода jsonable_encoder.
+    """
+    items = await add_viewer_state(db, viewer, posts, project_posts(posts, fields))
+    return json_items_response(items, response)
+
 
 @router.post("/create_post_for_user/{user_id}/", response_model=PostResponse)
 async def create_post_for_user(
         user_id: int,
         post: PostCreate,
-        db: Session = Depends(get_db),
+        db: AsyncSession = Depends(get_db),
         current_user: User = Depends(get_current_active_user),
 ) -> PostResponse:
-    db_user = db.query(User).filter(User.id == user_id).first()
+    db_user = await db.get(User, user_id)
     if db_user is None:
         raise HTTPException(status_code=404, detail="User not found")
 
     # Генерация slug из текущей даты и уникального идентификатора
     slug = Post.generate_slug()
 
-    db_post = Post(title=post.title, body=post.body, author_id=current_user.id, slug=slug, main_image=post.main_image,
+    # Картинка сохраняется в хранилище изображений, в базе остаётся только ссылка
+    main_image = await image_store.store_reference(post.main_image)
+
+    db_post = Post(title=post.title, body=post.body, author_id=current_user.id, slug=slug, main_image=main_image,
                    tags=post.tags, category=post.category)
     db.add(db_post)
-    db.commit()
-    db.refresh(db_post)
-
-    followers = db.query(Follow).filter(Follow.followed_id == current_user.id).all()
-
-    for follower in followers:
-        notification = Notification(
-            user_id=follower.follower_id,
-            title=f"{current_user.username} опубликовал новый пост",
-            description=db_post.title,
-            link=f"/posts/{db_post.slug}",
-        )
-        db.add(notification)
-
-    db.commit()
-
-    await notify_users_update()
+    await db.flush()
+    db.add_all([PostTag(post_id=db_post.id, tag=tag) for tag in PostTag.normalize(post.tags)])
+    await db.execute(update(User).where(User.id == current_user.id).values(posts_count=User.posts_count + 1))
+    await db.commit()
+    post_response_cache.invalidate()
+    profile_response_cache.invalidate()
+    related_posts_indexer.enqueue(db_post.id)
+
+    # Уведомления подписчикам создаются и рассылаются в фоне
+    follower_fanout.enqueue(
+        author_id=current_user.id,
+        title=f"{current_user.username} опубликовал новый пост",
+        description=db_post.title,
+        link=f"/posts/{db_post.slug}",
+    )
 
-    return db_post
+    return await db.scalar(select(Post).options(*post_response_options()).where(Post.id == db_post.id))
 
 
-@router.get("/get_posts_for_user/{user_id}/", response_model=List[PostResponse])
-async def get_posts_for_user(user_id: int, db: Session = Depends(get_db)):
-    db_user = db.query(User).filter(User.id == user_id).first()
+@router.get("/get_posts_for_user/{user_id}/", responses={200: {"model": List[PostListItem]}})
+async def get_posts_for_user(
+        user_id: int,
+        response: Response,
+        page: int = Query(1, ge=1),  # Номер страницы (если не передан cursor)
+        count: int = Query(20, ge=1, le=100),  # Количество постов на страницу
+        cursor: Optional[str] = Query(None),  # Курсор из заголовка X-Next-Cursor предыдущей страницы
+        fields: Optional[Set[str]] = Depends(post_list_fields),
+        viewer: Optional[User] = Depends(feed_viewer),
+        db: AsyncSession = Depends(get_db),
+):
+    db_user = await db.get(User, user_id)
     if db_user is None:
         raise HTTPException(status_code=404, detail="User not found")
 
-    posts = db.query(Post).filter(Post.author_id == user_id).all()
-    if posts is None:
-        raise HTTPException(status_code=404, detail="Posts not found")
-    return posts
+    posts = (await db.scalars(paginate(
+        select(Post).options(*post_list_options()).where(Post.author_id == user_id),
+        Post.date, Post.id, count, cursor, page,
+    ))).all()
+    set_next_cursor(response, posts, count)
+    return await feed_response(db, response, posts, fields, viewer)
 
 
-@alru_cache(ttl=30)
-@router.get("/get_all_posts", response_model=List[PostResponse])
+@router.get("/get_all_posts", responses={200: {"model": List[PostListItem]}})
 async def get_all_posts(
+        response: Response,
         page: int = Query(1, ge=1),  # Номер страницы (начиная с 1)
         count: int = Query(3, ge=1, le=100),  # Количество постов на страницу
-        db: Session = Depends(get_db),
+        cursor: Optional[str] = Query(None),  # Курсор из заголовка X-Next-Cursor предыдущей страницы
+        fields: Optional[Set[str]] = Depends(post_list_fields),
+        viewer: Optional[User] = Depends(feed_viewer),
+        db: AsyncSession = Depends(get_db),
 ):
     """
     Получение всех постов с поддержкой пагинации.
     Параметры:
     - `page`: Номер страницы (по умолчанию: 1)
     - `count`: Количество постов на страницу (по умолчанию: 10)
+    - `cursor`: Курсор следующей страницы; если передан, `page` игнорируется
+    - `fields`: Поля постов через запятую (по умолчанию все поля PostListItem)
+    Курсор следующей страницы возвращается в заголовке `X-Next-Cursor`.
     """
-    # Вычисляем смещение
-    offset = (page - 1) * count
+    # Запрашиваем данные из базы с учётом пагинации (последние посты первыми)
+    posts = (await db.scalars(paginate(
+        select(Post).options(*post_list_options()),
+        Post.date, Post.id, count, cursor, page,
+    ))).all()
+    set_next_cursor(response, posts, count)
 
-    # Запрашиваем данные из базы с учётом пагинации
-    posts = (
-        db.query(Post)
-        .order_by(Post.date.desc())  # Сортируем по дате (последние посты первыми)
-        .offset(offset)
-        .limit(count)
-        .all()
-    )
-
-    return posts
+    return await feed_response(db, response, posts, fields, viewer)
 
 
-@alru_cache(maxsize=128)
 @router.get("/getpost/{slug:path}/", response_model=PostResponse)
-async def get_post_by_slug(slug: str, db: Session = Depends(get_db)):
-    post = db.query(Post).filter(Post.slug == slug).first()
+async def get_post_by_slug(
+        slug: str,
+        response: Response,
+        comments_limit: int = Query(settings.POST_COMMENTS_LIMIT, ge=0, le=100),  # Сколько последних комментариев встроить
+        db: AsyncSession = Depends(get_db),
+):
+    """
+    Пост с последними `comments_limit` комментариями (от новых к старым).
+    Курсор для более ранних комментариев через /posts/{post_id}/comments возвращается в заголовке `X-Next-Cursor`.
+    """
+    post = await db.scalar(
+        select(Post).options(joinedload(Post.author), noload(Post.comments)).where(Post.slug == slug)
+    )
     if not post:
         raise HTTPException(status_code=404, detail="Post not found")
-    return post
+    result = PostResponse.model_validate(post, from_attributes=True)
+    if comments_limit:
+        result.comments = await list_comments(db, response, post.id, comments_limit, None)
+    return result
+
+
+async def list_comments(db: AsyncSession, response: Response, post_id: int, count: int, cursor: Optional[str]):
+    comments = (await db.scalars(paginate(
+        select(PostComment).options(joinedload(PostComment.author)).where(PostComment.post_id == post_id),
+        PostComment.date, PostComment.id, count, cursor,
+    ))).all()
+    set_next_cursor(response, comments, count)
+    return [PostCommentBase.model_validate(comment, from_attributes=True) for comment in comments]
+
+
+@router.get("/posts/{post_id}/comments", response_model=List[PostCommentBase])
+async def get_post_comments(
+        post_id: int,
+        response: Response,
+        count: int = Query(20, ge=1, le=100),
+        cursor: Optional[str] = Query(None),  # Курсор из заголовка X-Next-Cursor предыдущей страницы
+        db: AsyncSession = Depends(get_db),
+):
+    """
+    Комментарии поста от новых к старым, постранично по курсору.
+    """
+    if await db.scalar(select(Post.id).where(Post.id == post_id)) is None:
+        raise HTTPException(status_code=404, detail="Post not found")
+    return await list_comments(db, response, post_id, count, cursor)
 
 
 @router.post("/create_comment/{post_id}/", response_model=PostCommentBase)
@@ -106,10 +238,13 @@ async def create_comment(
         post_id: int,
         comment: CommentCreate,
         current_user: User = Depends(get_current_active_user),
-        db: Session = Depends(get_db)
+        db: AsyncSession = Depends(get_db)
 ):
-    post = db.query(Post).filter(Post.id == post_id).first()
-    if not post:
+    # Счётчик комментариев увеличивается атомарно в той же транзакции, что и вставка
+    updated = await db.scalar(
+        update(Post).where(Post.id == post_id).values(comments_count=Post.comments_count + 1).returning(Post.id)
+    )
+    if updated is None:
         raise HTTPException(status_code=404, detail="Post not found")
 
     new_comment = PostComment(
@@ -119,94 +254,142 @@ async def create_comment(
         date=datetime.now()
     )
     db.add(new_comment)
-    db.commit()
-    db.refresh(new_comment)
+    await db.commit()
+    post_response_cache.invalidate()
+    await db.refresh(new_comment, attribute_names=["author"])
     return new_comment
 
 
-@router.post("/like_post/{post_id}/")
-async def like_post(post_id: int, db: Session = Depends(get_db), current_user: User = Depends(get_current_active_user)):
-    post = db.query(Post).filter(Post.id == post_id).first()
-    if not post:
+async def change_likes(db: AsyncSession, post_id: int, changed: bool, delta: int) -> int:
+    """
+    Счётчик лайков после вставки/удаления строки лайка.
+    Если строка действительно изменилась, счётчик меняется одним атомарным UPDATE ... RETURNING,
+    иначе (повторный запрос) просто читается текущее значение.
+    """
+    if changed:
+        likes = await db.scalar(
+            update(Post).where(Post.id == post_id).values(likes=Post.likes + delta).returning(Post.likes)
+        )
+    else:
+        likes = await db.scalar(select(Post.likes).where(Post.id == post_id))
+    if likes is None:
+        await db.rollback()
         raise HTTPException(status_code=404, detail="Post not found")
-
-    # Проверяем, лайкнул ли пользователь пост
-    existing_like = db.query(PostLike).filter_by(post_id=post_id, user_id=current_user.id).first()
-    if existing_like:
-        raise HTTPException(status_code=400, detail="You already liked this post")
-
-    # Создаем новый лайк
-    new_like = PostLike(post_id=post_id, user_id=current_user.id)
-    db.add(new_like)
-    post.likes += 1
-    db.commit()
-    return {"likes": post.likes}
+    await db.commit()
+    if changed:
+        post_response_cache.invalidate()
+    return likes
 
 
-@router.post("/unlike_post/{post_id}/")
-async def unlike_post(post_id: int, db: Session = Depends(get_db),
-                      current_user: User = Depends(get_current_active_user)):
-    post = db.query(Post).filter(Post.id == post_id).first()
-    if not post:
+@router.post("/like_post/{post_id}/", response_model=LikeResponse)
+async def like_post(post_id: int, db: AsyncSession = Depends(get_db), current_user: User = Depends(get_current_active_user)):
+    """
+    Поставить лайк. Повторный вызов ничего не меняет: дубль отсекается уникальным индексом (post_id, user_id).
+    Лайк несуществующего поста нарушает внешний ключ — это 404, а не 500.
+    """
+    try:
+        result = await db.execute(insert_ignore(PostLike).values(post_id=post_id, user_id=current_user.id))
+    except IntegrityError:
+        await db.rollback()
         raise HTTPException(status_code=404, detail="Post not found")
+    likes = await change_likes(db, post_id, result.rowcount == 1, 1)
+    return {"likes": likes, "isLiked": True}
 
-    # Проверяем, есть ли лайк от текущего пользователя
-    existing_like = db.query(PostLike).filter_by(post_id=post_id, user_id=current_user.id).first()
-    if not existing_like:
-        raise HTTPException(status_code=400, detail="You haven't liked this post yet")
 
-    # Удаляем лайк
-    db.delete(existing_like)
-    post.likes -= 1
-    db.commit()
-    return {"likes": post.likes}
+@router.post("/unlike_post/{post_id}/", response_model=LikeResponse)
+async def unlike_post(post_id: int, db: AsyncSession = Depends(get_db),
+                      current_user: User = Depends(get_current_active_user)):
+    """
+    Убрать лайк. Повторный вызов ничего не меняет.
+    """
+    result = await db.execute(delete(PostLike).where(PostLike.post_id == post_id, PostLike.user_id == current_user.id))
+    likes = await change_likes(db, post_id, result.rowcount == 1, -1)
+    return {"likes": likes, "isLiked": False}
 
 
 @router.get("/is_post_liked_by_user/{post_id}/")
-async def is_post_liked(post_id: int, request: Request, db: Session = Depends(get_db),
+async def is_post_liked(post_id: int, request: Request, db: AsyncSession = Depends(get_db),
                         current_user: User = Depends(get_current_active_user)):
-    like = db.query(PostLike).filter_by(post_id=post_id, user_id=current_user.id).first()
+    like = await db.scalar(select(PostLike.id).filter_by(post_id=post_id, user_id=current_user.id))
     return {"isLiked": like is not None}
 
 
-@router.get("/get_top_posts", response_model=List[PostResponse])
+@router.get("/likes/status", response_model=LikesStatusResponse)
+async def get_likes_status(
+        post_ids: List[int] = Query(..., max_length=200),
+        db: AsyncSession = Depends(get_db),
+        current_user: User = Depends(get_current_active_user)
+):
+    """
+    Статус лайков текущего пользователя сразу для списка постов (?post_ids=1&post_ids=2...) одним запросом.
+    """
+    if current_user is None:
+        raise HTTPException(status_code=401, detail="Not authenticated")
+    liked_ids = await liked_post_ids(db, current_user.id, post_ids)
+    return {"liked": {post_id: post_id in liked_ids for post_id in post_ids}}
+
+
+@router.get("/get_top_posts", responses={200: {"model": List[PostListItem]}})
 async def get_top_posts(
+        response: Response,
         count: int = Query(6, ge=1, le=100),  # Количество постов для возврата
-        db: Session = Depends(get_db)
+        window: Literal["all", "24h", "7d"] = Query("all"),  # Период рейтинга
+        fields: Optional[Set[str]] = Depends(post_list_fields),
+        viewer: Optional[User] = Depends(feed_viewer),
+        db: AsyncSession = Depends(get_db)
 ):
     """
-    Получение самых популярных постов по количеству просмотров.
+    Получение самых популярных постов из предрасчитанного рейтинга.
     Параметры:
     - `count`: Максимальное количество постов (по умолчанию: 6)
+    - `window`: `all` — просмотры и лайки за всё время, `24h`/`7d` — просмотры за период
     """
-    # Считаем количество просмотров через PostView и сортируем
-    top_posts = (
-        db.query(Post, func.count(PostView.id).label("view_count"))
-        .outerjoin(PostView, Post.id == PostView.post_id)  # Левое соединение с PostView
-        .group_by(Post.id)  # Группируем по ID поста
-        .order_by(func.count(PostView.id).desc())  # Сортируем по количеству просмотров
-        .limit(count)  # Ограничиваем количество возвращаемых записей
-        .all()
-    )
+    top_ids = leaderboard.top(window, count)
+    if not top_ids:
+        return []
+
+    posts = (await db.scalars(
+        select(Post).options(*post_list_options()).where(Post.id.in_(top_ids))
+    )).all()
 
-    # Извлекаем только посты из результата
-    return [post for post, view_count in top_posts]
+    # Возвращаем посты в порядке рейтинга
+    posts_by_id = {post.id: post for post in posts}
+    posts = [posts_by_id[post_id] for post_id in top_ids if post_id in posts_by_id]
+    return await feed_response(db, response, posts, fields, viewer)
 
 
 @router.get("/relatedposts/{slug:path}")
-async def get_related_posts(slug: str, db: Session = Depends(get_db)):
+async def get_related_posts(slug: str, db: AsyncSession = Depends(get_db)):
     # Находим текущий пост по slug
-    current_post = db.query(Post).filter(Post.slug == slug).first()
+    current_post = await db.scalar(
+        select(Post)
+        .options(load_only(Post.id, Post.title, Post.slug, Post.category, Post.excerpt_source))
+        .where(Post.slug == slug)
+    )
     if not current_post:
         raise HTTPException(status_code=404, detail="Post not found")
 
-    # Находим похожие посты по категории (исключая текущий пост)
-    related_posts = (
-        db.query(Post)
-        .filter(Post.category == current_post.category, Post.slug != slug)
-        .limit(5)
-        .all()
-    )
+    # Похожие посты по общим тегам, предрасчитанные фоновой задачей
+    related_fields = load_only(Post.id, Post.title, Post.slug, Post.category, Post.main_image)
+    related_posts = list((await db.scalars(
+        select(Post)
+        .options(related_fields)
+        .join(RelatedPost, RelatedPost.related_post_id == Post.id)
+        .where(RelatedPost.post_id == current_post.id)
+        .order_by(RelatedPost.score.desc())
+        .limit(RELATED_POSTS_COUNT)
+    )).all())
+
+    # Если похожих по тегам мало, добираем свежими постами той же категории
+    if len(related_posts) < RELATED_POSTS_COUNT:
+        exclude_ids = [current_post.id] + [post.id for post in related_posts]
+        related_posts += (await db.scalars(
+            select(Post)
+            .options(related_fields)
+            .where(Post.category == current_post.category, Post.id.not_in(exclude_ids))
+            .order_by(Post.date.desc(), Post.id.desc())
+            .limit(RELATED_POSTS_COUNT - len(related_posts))
+        )).all()
 
     # Возвращаем результат
     return {
@@ -214,40 +397,64 @@ async def get_related_posts(slug: str, db: Session = Depends(get_db)):
             "title": current_post.title,
             "slug": current_post.slug,
             "category": current_post.category,
-            "content": current_post.body,
+            "excerpt": make_excerpt(current_post.excerpt_source, settings.POST_EXCERPT_LENGTH),
         },
         "related_posts": [
-            {"title": post.title, "slug": post.slug, "category": post.category, "image": post.main_image}
+            {"title": post.title, "slug": post.slug, "category": post.category, "image": image_url(post.main_image, width=settings.LIST_IMAGE_WIDTH)}
             for post in related_posts
         ],
     }
 
 
+@router.get("/posts/by_tag/{tag}", responses={200: {"model": List[PostListItem]}})
+async def get_posts_by_tag(
+        tag: str,
+        response: Response,
+        count: int = Query(10, ge=1, le=100),  # Количество постов на страницу
+        cursor: Optional[str] = Query(None),  # Курсор из заголовка X-Next-Cursor предыдущей страницы
+        fields: Optional[Set[str]] = Depends(post_list_fields),
+        viewer: Optional[User] = Depends(feed_viewer),
+        db: AsyncSession = Depends(get_db),
+):
+    """
+    Посты с указанным тегом, от новых к старым.
+    """
+    normalized = PostTag.normalize([tag])
+    if not normalized:
+        return []
+
+    posts = (await db.scalars(paginate(
+        select(Post)
+        .options(*post_list_options())
+        .join(PostTag, PostTag.post_id == Post.id)
+        .where(PostTag.tag == normalized[0]),
+        Post.date, Post.id, count, cursor,
+    ))).all()
+    set_next_cursor(response, posts, count)
+    return await feed_response(db, response, posts, fields, viewer)
+
+
+@router.get("/posts_cache_stats")
+async def get_posts_cache_stats():
+    """
+    Счётчики попаданий и промахов кэша публичных лент постов.
+    """
+    return post_response_cache.stats()
+
+
 @router.post("/increment_views/{post_id}/")
-async def increment_views(post_id: int, request: Request, db: Session = Depends(get_db)):
+async def increment_views(post_id: int, request: Request, db: AsyncSession = Depends(get_db)):
     """
     Увеличение количества просмотров для поста с учетом уникального IP-адреса.
+    Просмотр учитывается в памяти и записывается в базу пачкой фоновой задачей.
     """
-    post = db.query(Post).filter(Post.id == post_id).first()
-    if not post:
+    views_count = await db.scalar(select(Post.views_count).where(Post.id == post_id))
+    if views_count is None:
         raise HTTPException(status_code=404, detail="Post not found")
 
-    ip_address = request.client.host
-    one_hour_ago = datetime.now() - timedelta(hours=1)
-
     # Проверяем, был ли уже просмотр с этого IP-адреса за последний час
-    existing_view = db.query(PostView).filter(
-        PostView.post_id == post_id,
-        PostView.ip_address == ip_address,
-        PostView.timestamp >= one_hour_ago
-    ).first()
-
-    if existing_view:
+    if not view_ingestion.record(post_id, request.client.host):
         return {"message": "View already counted in the last hour"}
 
-    # Добавляем новую запись просмотра
-    new_view = PostView(post_id=post_id, ip_address=ip_address, timestamp=datetime.now())
-    db.add(new_view)
-    db.commit()
-
-    return {"views": len(post.views)}  # Возвращаем количество просмотров
+    # Возвращаем количество просмотров с учётом ещё не записанных
+    return {"views": views_count + view_ingestion.pending_count(post_id)}
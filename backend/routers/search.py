@@ -0,0 +1,41 @@
+from typing import List, Optional, Set
+
+from fastapi import APIRouter, Depends, Query, Response
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..database import get_db
+from ..models import Post, User
+from ..schemas import PostListItem
+from ..search.fulltext import search_post_ids
+from .posts import post_list_options, post_list_fields, feed_viewer, feed_response
+
+router = APIRouter()
+
+
+@router.get("/search", responses={200: {"model": List[PostListItem]}})
+async def search_posts(
+        response: Response,
+        q: str = Query(..., min_length=1, max_length=200),  # Поисковый запрос
+        page: int = Query(1, ge=1),  # Номер страницы (начиная с 1)
+        count: int = Query(10, ge=1, le=50),  # Количество постов на страницу
+        fields: Optional[Set[str]] = Depends(post_list_fields),
+        viewer: Optional[User] = Depends(feed_viewer),
+        db: AsyncSession = Depends(get_db),
+):
+    """
+    Полнотекстовый поиск по заголовку, тексту и тегам постов.
+    Каждое слово запроса ищется как префикс, результаты отсортированы по релевантности.
+    """
+    post_ids = await search_post_ids(db, q, limit=count, offset=(page - 1) * count)
+    if not post_ids:
+        return []
+
+    posts = (await db.scalars(
+        select(Post).options(*post_list_options()).where(Post.id.in_(post_ids))
+    )).all()
+
+    # Возвращаем посты в порядке релевантности
+    posts_by_id = {post.id: post for post in posts}
+    posts = [posts_by_id[post_id] for post_id in post_ids if post_id in posts_by_id]
+    return await feed_response(db, response, posts, fields, viewer)
@@ -1,18 +1,25 @@
-from fastapi import APIRouter, HTTPException, Depends, status
-from sqlalchemy.orm import Session
-from ..auth.auth_handler import get_current_active_user
+from fastapi import APIRouter, HTTPException, Depends, Query, Response, status
+from sqlalchemy import select, update, delete
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import joinedload
+from sqlalchemy.ext.asyncio import AsyncSession
+from ..auth.auth_handler import get_current_active_user, invalidate_principal
+from ..cache.response_cache import profile_response_cache
 from ..models import Post, User, PostComment, PostLike, Notification, Follow
 from ..schemas import PostCreate, PostResponse, CommentCreate, PostCommentBase, UserResponse, UserResponseWithFollow, \
-    FollowResponse, FollowCreate, NotificationBase, NotificationResponse, UpdateUserProfile
-from ..database import get_db
+    FollowResponse, FollowCreate, NotificationBase, NotificationResponse, UpdateUserProfile, FollowingStatusResponse, \
+    AuthorSummary
+from ..database import get_db, insert_ignore
+from ..pagination import paginate, set_next_cursor
 from typing import List, Optional
 from ..hooks.websocket import notify_users_update
-from async_lru import alru_cache
+from ..storage.images import image_store
+from ..viewer_state import followed_user_ids
+from ..settings.config import settings
 
 router = APIRouter()
 
 
-@alru_cache(ttl=120)
 @router.get("/users/me/", response_model=UserResponse)
 async def read_users_me(current_user: User = Depends(get_current_active_user)):
     if current_user is None:
@@ -30,62 +37,76 @@ async def read_users_me(current_user: User = Depends(get_current_active_user)):
 @router.get("/users/{user_id}", response_model=UserResponseWithFollow)
 async def get_user_profile(
         user_id: int,
+        response: Response,
         current_user: Optional[User] = Depends(get_current_active_user),  # Сделано опциональным
-        db: Session = Depends(get_db)
+        db: AsyncSession = Depends(get_db)
 ):
-    # Получаем пользователя
-    user = db.query(User).filter(User.id == user_id).first()
+    # Получаем пользователя вместе со счётчиками подписчиков, подписок и постов
+    user = await db.get(User, user_id)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
 
-    # Проверяем подписку только для авторизованных пользователей
-
-    # Считаем количество подписчиков
-    followers_count = db.query(Follow).filter(Follow.followed_id == user_id).count()
-
-    # Считаем количество подписок
-    following_count = db.query(Follow).filter(Follow.follower_id == user_id).count()
+    # Авторизованным отдаётся email, такой ответ нельзя кэшировать на общем прокси
+    if current_user:
+        response.headers["Cache-Control"] = settings.HTTP_PRIVATE_CACHE_CONTROL
 
     # Формируем ответ
     return UserResponseWithFollow(
         id=user.id,
         username=user.username,
         email=user.email if current_user else None,
-        followers_count=followers_count,
-        following_count=following_count,
+        followers_count=user.followers_count,
+        following_count=user.following_count,
+        posts_count=user.posts_count,
         profile_image=user.profile_image
     )
 
 
+async def change_follow_counts(db: AsyncSession, follower_id: int, followed_id: int, delta: int):
+    """
+    Атомарно изменить счётчики подписок обоих пользователей (UPDATE ... SET x = x + delta).
+    Возвращает обновлённых пользователей; если того, на кого подписываются, нет — откатывает транзакцию и отдаёт 404.
+    """
+    followed = await db.scalar(
+        update(User).where(User.id == followed_id)
+        .values(followers_count=User.followers_count + delta).returning(User)
+    )
+    if followed is None:
+        await db.rollback()
+        raise HTTPException(status_code=404, detail="User not found")
+    follower = await db.scalar(
+        update(User).where(User.id == follower_id)
+        .values(following_count=User.following_count + delta).returning(User)
+    )
+    return follower, followed
+
+
 @router.post("/users/{user_id}/follow", response_model=FollowResponse)
 async def follow_user(
         user_id: int,
         current_user: User = Depends(get_current_active_user),
-        db: Session = Depends(get_db)
+        db: AsyncSession = Depends(get_db)
 ):
     # Нельзя подписаться на самого себя
     if current_user.id == user_id:
         raise HTTPException(status_code=400, detail="Cannot follow yourself")
 
-    # Проверяем, подписан ли уже пользователь
-    existing_follow = db.query(Follow).filter(
-        Follow.follower_id == current_user.id,
-        Follow.followed_id == user_id
-    ).first()
-    if existing_follow:
+    # Создаем запись о подписке; повторную подписку отсекает уникальное ограничение,
+    # а подписку на несуществующего пользователя — внешний ключ
+    try:
+        follow = (await db.execute(
+            insert_ignore(Follow).values(follower_id=current_user.id, followed_id=user_id)
+            .returning(Follow.id, Follow.date)
+        )).first()
+    except IntegrityError:
+        await db.rollback()
+        raise HTTPException(status_code=404, detail="User not found")
+    if follow is None:
         raise HTTPException(status_code=400, detail="Already following this user")
 
-    # Создаем запись о подписке
-    follow = Follow(follower_id=current_user.id, followed_id=user_id)
-    db.add(follow)
-    db.commit()
-    db.refresh(follow)
+    follower, followed = await change_follow_counts(db, current_user.id, user_id, 1)
 
-    # Загружаем связанные объекты для ответа
-    follower = db.query(User).filter(User.id == follow.follower_id).first()
-    followed = db.query(User).filter(User.id == follow.followed_id).first()
-
-    # Создаем уведомление для пользователя, на которого подписались
+    # Создаем уведомление для пользователя, на которого подписались, в той же транзакции
     notification = Notification(
         user_id=user_id,
         title="Новый подписчик",
@@ -93,9 +114,10 @@ async def follow_user(
         link=f"/profile/{current_user.id}",
     )
     db.add(notification)
-    db.commit()
+    await db.commit()
+    profile_response_cache.invalidate()
 
-    await notify_users_update()
+    await notify_users_update([notification])
 
     # Формируем и возвращаем ответ
     return FollowResponse(
@@ -111,27 +133,23 @@ async def follow_user(
 async def unfollow_user(
         user_id: int,
         current_user: User = Depends(get_current_active_user),
-        db: Session = Depends(get_db)
+        db: AsyncSession = Depends(get_db)
 ):
     # Нельзя отписаться от самого себя
     if current_user.id == user_id:
         raise HTTPException(status_code=400, detail="Cannot unfollow yourself")
 
-    # Проверяем, есть ли подписка
-    follow = db.query(Follow).filter(
-        Follow.follower_id == current_user.id,
-        Follow.followed_id == user_id
-    ).first()
-
-    if not follow:
+    # Удаляем запись о подписке, если она есть
+    follow = (await db.execute(
+        delete(Follow).where(Follow.follower_id == current_user.id, Follow.followed_id == user_id)
+        .returning(Follow.id, Follow.date)
+    )).first()
+    if follow is None:
         raise HTTPException(status_code=400, detail="Not following this user")
 
-    # Удаляем запись о подписке
-    db.delete(follow)
-    db.commit()
-
-    follower = db.query(User).filter(User.id == follow.follower_id).first()
-    followed = db.query(User).filter(User.id == follow.followed_id).first()
+    follower, followed = await change_follow_counts(db, current_user.id, user_id, -1)
+    await db.commit()
+    profile_response_cache.invalidate()
 
     # Формируем и возвращаем ответ
     return FollowResponse(
@@ -142,42 +160,106 @@ async def unfollow_user(
     )
 
 
+async def list_follows(db: AsyncSession, response: Response, user_id: int, count: int, cursor: Optional[str],
+                       by_column, user_relationship):
+    """
+    Страница подписок пользователя по (date, id) от новых к старым: by_column — колонка с user_id,
+    user_relationship — сторона подписки, которую нужно вернуть.
+    """
+    if await db.get(User, user_id) is None:
+        raise HTTPException(status_code=404, detail="User not found")
+
+    follows = (await db.scalars(paginate(
+        select(Follow)
+        .options(joinedload(user_relationship).load_only(User.id, User.username, User.profile_image))
+        .where(by_column == user_id),
+        Follow.date, Follow.id, count, cursor,
+    ))).all()
+    set_next_cursor(response, follows, count)
+    return [getattr(follow, user_relationship.key) for follow in follows]
+
+
+@router.get("/users/{user_id}/followers", response_model=List[AuthorSummary])
+async def get_followers(
+        user_id: int,
+        response: Response,
+        count: int = Query(20, ge=1, le=100),
+        cursor: Optional[str] = Query(None),  # Курсор из заголовка X-Next-Cursor предыдущей страницы
+        db: AsyncSession = Depends(get_db)
+):
+    """
+    Подписчики пользователя, сначала подписавшиеся последними.
+    """
+    return await list_follows(db, response, user_id, count, cursor, Follow.followed_id, Follow.follower)
+
+
+@router.get("/users/{user_id}/following", response_model=List[AuthorSummary])
+async def get_following(
+        user_id: int,
+        response: Response,
+        count: int = Query(20, ge=1, le=100),
+        cursor: Optional[str] = Query(None),  # Курсор из заголовка X-Next-Cursor предыдущей страницы
+        db: AsyncSession = Depends(get_db)
+):
+    """
+    Пользователи, на которых подписан пользователь, сначала последние подписки.
+    """
+    return await list_follows(db, response, user_id, count, cursor, Follow.follower_id, Follow.followed)
+
+
 # Маршрут для проверки подписки
 @router.get("/users/{user_id}/is_following", response_model=bool)
 async def check_following(
         user_id: int,
         current_user: User = Depends(get_current_active_user),
-        db: Session = Depends(get_db)
+        db: AsyncSession = Depends(get_db)
 ):
     # Пользователь не может быть подписан сам на себя
     if current_user.id == user_id:
         return False
 
     # Проверяем наличие подписки
-    is_following = db.query(Follow).filter(
+    is_following = await db.scalar(select(Follow.id).where(
         Follow.follower_id == current_user.id,
         Follow.followed_id == user_id
-    ).first() is not None
+    )) is not None
 
     return is_following
 
 
+@router.get("/users/following/status", response_model=FollowingStatusResponse)
+async def get_following_status(
+        user_ids: List[int] = Query(..., max_length=200),
+        current_user: User = Depends(get_current_active_user),
+        db: AsyncSession = Depends(get_db)
+):
+    """
+    Статус подписки текущего пользователя сразу на список пользователей (?user_ids=1&user_ids=2...) одним запросом.
+    """
+    if current_user is None:
+        raise HTTPException(status_code=401, detail="Not authenticated")
+    followed = await followed_user_ids(db, current_user.id, user_ids)
+    return {"following": {user_id: user_id in followed for user_id in user_ids}}
+
+
 @router.put("/update/user/me", response_model=UpdateUserProfile)
 async def update_user_profile(
     data: UpdateUserProfile,
     current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     # Обновление данных пользователя
-    user = db.query(User).filter(User.id == current_user.id).first()
+    user = await db.get(User, current_user.id)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
 
     user.username = data.username
     user.email = data.email
-    user.profile_image = data.profile_image
+    user.profile_image = await image_store.store_reference(data.profile_image)
 
-    db.commit()
-    db.refresh(user)
+    await db.commit()
+    await db.refresh(user)
+    invalidate_principal(user.id)
+    profile_response_cache.invalidate()
 
     return user
@@ -1,8 +1,13 @@
 # schemas.py
 
+import html
+import re
 from datetime import datetime
-from pydantic import BaseModel, field_validator, validator
-from typing import Optional, List
+from pydantic import BaseModel, Field, field_validator, validator
+from typing import Optional, List, Dict
+
+from .settings.config import settings
+from .storage.images import image_url
 
 
 class Token(BaseModel):
@@ -24,7 +29,11 @@ class UserCreate(BaseModel):
 class UpdateUserProfile(BaseModel):
     username: str
     email: str
-    profile_image: str  # Base64 кодированное изображение
+    profile_image: str  # Base64 кодированное изображение или ссылка на уже загруженное
+
+    @field_validator("profile_image")
+    def resolve_profile_image(cls, value):
+        return image_url(value)
 
 
 class UserResponse(BaseModel):
@@ -33,6 +42,10 @@ class UserResponse(BaseModel):
     email: Optional[str] = None
     profile_image: Optional[str] = None
 
+    @field_validator("profile_image")
+    def resolve_profile_image(cls, value):
+        return image_url(value)
+
     class Config:
         orm_mode = True
         from_attributes = True
@@ -70,6 +83,7 @@ class FollowResponse(BaseModel):
 class UserResponseWithFollow(UserResponse):
     followers_count: int
     following_count: int
+    posts_count: int
 
     class Config:
         orm_mode = True
@@ -90,6 +104,7 @@ class PostBase(BaseModel):
 
 
 class PostCommentBase(BaseModel):
+    id: Optional[int] = None
     body: str
     author: UserResponse
     date: Optional[datetime] = None
@@ -115,10 +130,14 @@ class PostResponse(PostBase):
     main_image: Optional[str]
     likes: int = 0
     views_count: int  # Количество просмотров
+    comments_count: int = 0
     comments: List[PostCommentBase] = []
     tags: List[str] = []  # Список тегов
     category: str
 
+    @field_validator("main_image")
+    def resolve_main_image(cls, value):
+        return image_url(value)
 
     def __init__(self, **data):
         super().__init__(**data)
@@ -129,6 +148,78 @@ class PostResponse(PostBase):
         orm_mode = True
 
 
+def make_excerpt(source: Optional[str], length: int) -> str:
+    """
+    Короткий текст без HTML-разметки для карточки поста.
+    """
+    text = re.sub(r"<[^>]*>?", " ", source or "")
+    text = " ".join(html.unescape(text).split())
+    if len(text) <= length:
+        return text
+    return text[:length].rsplit(" ", 1)[0] + "…"
+
+
+class AuthorSummary(BaseModel):
+    id: int
+    username: str
+    profile_image: Optional[str] = None
+
+    @field_validator("profile_image")
+    def resolve_profile_image(cls, value):
+        return image_url(value, width=settings.LIST_AVATAR_WIDTH)
+
+    class Config:
+        from_attributes = True
+
+
+class PostListItem(BaseModel):
+    """
+    Облегчённый пост для списков: без тела и комментариев.
+    """
+    id: int
+    title: str
+    slug: str
+    excerpt: str = Field("", validation_alias="excerpt_source")
+    date: Optional[datetime] = None
+    main_image: Optional[str] = None
+    author: AuthorSummary
+    likes: int = 0
+    views_count: int = 0
+    comments_count: int = 0
+    tags: List[str] = []
+    category: str
+
+    @field_validator("excerpt", mode="before")
+    def build_excerpt(cls, value):
+        return make_excerpt(value, settings.POST_EXCERPT_LENGTH)
+
+    @field_validator("main_image")
+    def resolve_main_image(cls, value):
+        return image_url(value, width=settings.LIST_IMAGE_WIDTH)
+
+    @field_validator("likes", "tags", mode="before")
+    def default_empty(cls, value, info):
+        if value is None:
+            return 0 if info.field_name == "likes" else []
+        return value
+
+    class Config:
+        from_attributes = True
+
+
+class LikeResponse(BaseModel):
+    likes: int
+    isLiked: bool
+
+
+class LikesStatusResponse(BaseModel):
+    liked: Dict[int, bool]  # post_id -> лайкнут ли пост текущим пользователем
+
+
+class FollowingStatusResponse(BaseModel):
+    following: Dict[int, bool]  # user_id -> подписан ли на него текущий пользователь
+
+
 class PostCreate(PostBase):
     main_image: Optional[str]
     tags: Optional[List[str]] = None  # Необязательный список строк
@@ -148,6 +239,7 @@ class NotificationBase(BaseModel):
 class NotificationResponse(NotificationBase):
     id: int
     date: Optional[datetime] = None
+    is_read: bool = False
 
     def __init__(self, **data):
         super().__init__(**data)
@@ -156,3 +248,11 @@ class NotificationResponse(NotificationBase):
 
     class Config:
         orm_mode = True
+
+
+class NotificationsMarkRead(BaseModel):
+    ids: Optional[List[int]] = None  # Если не переданы, прочитанными отмечаются все
+
+
+class UnreadCountResponse(BaseModel):
+    unread: int
@@ -0,0 +1,99 @@
+import re
+from typing import List
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+# Заголовок важнее тегов, теги важнее текста поста
+TITLE_WEIGHT, BODY_WEIGHT, TAGS_WEIGHT = 10.0, 1.0, 5.0
+
+# Для PostgreSQL индекс строится по выражению, запрос должен использовать то же выражение.
+# to_tsvector(json) индексирует только строковые значения, уже раскодированные из JSON
+PG_DOCUMENT = (
+    "setweight(to_tsvector('simple', coalesce(title, '')), 'A') || "
+    "setweight(to_tsvector('simple', coalesce(tags, '[]'::json)), 'B') || "
+    "setweight(to_tsvector('simple', coalesce(body, '')), 'D')"
+)
+PG_INDEX = "ix_posts_search"
+
+
+def sqlite_tags(row: str) -> str:
+    # Теги хранятся в JSON с \uXXXX вместо не-ASCII символов: индексируется раскодированный текст
+    return f"(SELECT group_concat(value, ' ') FROM json_each({row}.tags))"
+
+
+SQLITE_SETUP = [
+    # Индекс без контента хранит только токены: поиску нужны лишь rowid и bm25,
+    # а при удалении триггеры передают те же значения, что были проиндексированы
+    """CREATE VIRTUAL TABLE posts_fts USING fts5(
+        title, body, tags, content='', tokenize='unicode61 remove_diacritics 2'
+    )""",
+    f"""CREATE TRIGGER posts_fts_insert AFTER INSERT ON posts BEGIN
+        INSERT INTO posts_fts(rowid, title, body, tags) VALUES (new.id, new.title, new.body, {sqlite_tags('new')});
+    END""",
+    f"""CREATE TRIGGER posts_fts_delete AFTER DELETE ON posts BEGIN
+        INSERT INTO posts_fts(posts_fts, rowid, title, body, tags)
+        VALUES ('delete', old.id, old.title, old.body, {sqlite_tags('old')});
+    END""",
+    # Срабатывает только при изменении индексируемых колонок, а не счётчиков просмотров и лайков
+    f"""CREATE TRIGGER posts_fts_update AFTER UPDATE OF title, body, tags ON posts BEGIN
+        INSERT INTO posts_fts(posts_fts, rowid, title, body, tags)
+        VALUES ('delete', old.id, old.title, old.body, {sqlite_tags('old')});
+        INSERT INTO posts_fts(rowid, title, body, tags) VALUES (new.id, new.title, new.body, {sqlite_tags('new')});
+    END""",
+    f"INSERT INTO posts_fts(rowid, title, body, tags) SELECT id, title, body, {sqlite_tags('posts')} FROM posts",
+]
+
+# Индекс первой версии (content='posts') индексировал теги как JSON-текст и пересоздаётся целиком
+SQLITE_DROP_LEGACY = [
+    "DROP TRIGGER IF EXISTS posts_fts_insert",
+    "DROP TRIGGER IF EXISTS posts_fts_delete",
+    "DROP TRIGGER IF EXISTS posts_fts_update",
+    "DROP TABLE IF EXISTS posts_fts",
+]
+
+
+def setup_fulltext(conn):
+    """
+    Создать полнотекстовый индекс постов, если его ещё нет.
+    SQLite — таблица FTS5 с триггерами, PostgreSQL — GIN-индекс по tsvector.
+    """
+    if conn.dialect.name == "sqlite":
+        definition = conn.execute(text("SELECT sql FROM sqlite_master WHERE name = 'posts_fts'")).scalar()
+        if definition is None or "content='posts'" in definition:
+            for statement in SQLITE_DROP_LEGACY + SQLITE_SETUP:
+                conn.execute(text(statement))
+    elif conn.dialect.name == "postgresql":
+        conn.execute(text("DROP INDEX IF EXISTS ix_posts_fulltext"))
+        conn.execute(text(f"CREATE INDEX IF NOT EXISTS {PG_INDEX} ON posts USING GIN (({PG_DOCUMENT}))"))
+
+
+def query_terms(query: str) -> List[str]:
+    # Из запроса берутся только слова, чтобы пользователь не мог передать синтаксис FTS
+    return re.findall(r"\w+", query.lower())[:16]
+
+
+async def search_post_ids(db: AsyncSession, query: str, limit: int, offset: int) -> List[int]:
+    """
+    Id постов, подходящих под все слова запроса (каждое — как префикс), в порядке релевантности.
+    """
+    terms = query_terms(query)
+    if not terms:
+        return []
+
+    if db.bind.dialect.name == "postgresql":
+        statement = text(
+            f"SELECT id FROM posts WHERE ({PG_DOCUMENT}) @@ to_tsquery('simple', :query) "
+            f"ORDER BY ts_rank({PG_DOCUMENT}, to_tsquery('simple', :query)) DESC, id DESC "
+            "LIMIT :limit OFFSET :offset"
+        )
+        match = " & ".join(f"{term}:*" for term in terms)
+    else:
+        statement = text(
+            "SELECT rowid FROM posts_fts WHERE posts_fts MATCH :query "
+            f"ORDER BY bm25(posts_fts, {TITLE_WEIGHT}, {BODY_WEIGHT}, {TAGS_WEIGHT}), rowid DESC "
+            "LIMIT :limit OFFSET :offset"
+        )
+        match = " ".join(f'"{term}"*' for term in terms)
+
+    return list((await db.scalars(statement, {"query": match, "limit": limit, "offset": offset})).all())
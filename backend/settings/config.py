@@ -1,4 +1,4 @@
-from typing import ClassVar
+from typing import ClassVar, Literal, List
 from pydantic_settings import BaseSettings, SettingsConfigDict
 from pydantic import (
     AliasChoices,
@@ -8,15 +8,112 @@ from pydantic import (
     ImportString,
     PostgresDsn,
     RedisDsn,
+    field_validator,
 )
 import os
 
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
 
 class Settings(BaseSettings):
     SECRET_KEY: str
     ALGORITHM: str
     ACCESS_TOKEN_EXPIRE_MINUTES: int
 
+    # База данных: sqlite+aiosqlite:///... или postgresql+asyncpg://...; пусто — base.db рядом с бэкендом
+    DB_URL: str = Field("", validate_default=True)
+    DB_ECHO: bool = False
+    # Пул соединений (для SQLite в памяти не используется)
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_RECYCLE: int = 1800
+    DB_POOL_TIMEOUT: float = 30.0
+    # Создавать и обновлять схему при старте приложения; при False — python -m backend.migrate перед запуском
+    DB_AUTO_MIGRATE: bool = True
+    # PRAGMA для каждого нового соединения SQLite
+    SQLITE_JOURNAL_MODE: str = "WAL"
+    SQLITE_SYNCHRONOUS: str = "NORMAL"
+    SQLITE_BUSY_TIMEOUT_MS: int = 5000
+    SQLITE_CACHE_SIZE: int = -64000  # Отрицательное значение — размер в КиБ
+    SQLITE_MMAP_SIZE: int = 256 * 1024 * 1024
+
+    # Сколько хэшей bcrypt может считаться одновременно
+    PASSWORD_HASH_WORKERS: int = 4
+    # Кэш пользователей и проверенных токенов для get_current_user
+    PRINCIPAL_CACHE_TTL: int = 60
+    PRINCIPAL_CACHE_MAXSIZE: int = 10000
+    TOKEN_CACHE_MAXSIZE: int = 10000
+
+    # Кэш ответов публичных лент постов
+    RESPONSE_CACHE_TTL: int = 30
+    RESPONSE_CACHE_MAXSIZE: int = 512
+    # Cache-Control для публичных ответов с ETag; для кэширования на обратном прокси,
+    # например "public, max-age=10, stale-while-revalidate=30"
+    HTTP_CACHE_CONTROL: str = "public, no-cache"
+    HTTP_PRIVATE_CACHE_CONTROL: str = "private, no-cache"
+
+    # Кодирование и сжатие ответов
+    JSON_RESPONSE: Literal["orjson", "json"] = "orjson"
+    COMPRESSION_ENABLED: bool = True
+    COMPRESSION_MINIMUM_SIZE: int = 1024
+    COMPRESSION_CONTENT_TYPES: List[str] = ["application/json", "text/", "application/javascript", "image/svg+xml"]
+    COMPRESSION_GZIP_LEVEL: int = 6
+    COMPRESSION_BROTLI_QUALITY: int = 4
+
+    # Метрики Prometheus на /metrics: задержки по маршрутам, SQL на запрос, websocket и кэши
+    METRICS_ENABLED: bool = True
+
+    # Отложенная запись просмотров постов
+    VIEW_FLUSH_INTERVAL: float = 5.0
+    VIEW_FLUSH_BATCH_SIZE: int = 500
+    VIEW_DEDUP_WINDOW_MINUTES: int = 60
+
+    # Рейтинг популярных постов
+    LEADERBOARD_SIZE: int = 100
+    LEADERBOARD_REFRESH_INTERVAL: float = 60.0
+    LEADERBOARD_LIKE_WEIGHT: float = 1.0
+
+    # Websocket-уведомления
+    WS_SEND_QUEUE_SIZE: int = 64
+    WS_SEND_TIMEOUT: float = 5.0
+    # memory — один процесс, database — несколько воркеров с общей базой
+    BROADCAST_BACKEND: Literal["memory", "database"] = "memory"
+    BROADCAST_POLL_INTERVAL: float = 0.5
+    BROADCAST_RETENTION_SECONDS: int = 300
+
+    # Размер пачки уведомлений подписчикам о новом посте
+    FANOUT_CHUNK_SIZE: int = 1000
+    # Хранение уведомлений: прочитанные и все остальные удаляются по истечении срока
+    NOTIFICATION_READ_RETENTION_DAYS: int = 30
+    NOTIFICATION_RETENTION_DAYS: int = 180
+    NOTIFICATION_COMPACTION_INTERVAL: float = 3600.0
+
+    # Сколько последних комментариев встраивается в ответ /getpost; остальные — через /posts/{post_id}/comments
+    POST_COMMENTS_LIMIT: int = 20
+
+    # Похожие посты по тегам
+    RELATED_POSTS_COUNT: int = 5
+    RELATED_POSTS_CANDIDATES: int = 500
+
+    # Хранилище изображений
+    IMAGE_STORAGE_DIR: str = os.path.join(BACKEND_DIR, "media")
+    IMAGE_THUMBNAIL_WIDTHS: List[int] = [96, 480]
+    IMAGE_MAX_BYTES: int = 10 * 1024 * 1024
+    # Адрес бэкенда, с которого клиенты загружают /images/... Фронтенд работает на другом origin, поэтому
+    # по умолчанию это тот же адрес, что и API_URL фронтенда; пусто — относительные ссылки (бэкенд и фронтенд
+    # за одним доменом)
+    MEDIA_BASE_URL: str = "http://localhost:8000"
+
+    # Списки постов: длина превью текста и ширина миниатюр
+    POST_EXCERPT_LENGTH: int = 200
+    LIST_IMAGE_WIDTH: int = 480
+    LIST_AVATAR_WIDTH: int = 96
+
+    @field_validator("DB_URL")
+    def default_db_url(cls, value):
+        # Абсолютный путь, чтобы база не зависела от рабочей директории
+        return value or f"sqlite+aiosqlite:///{os.path.join(BACKEND_DIR, 'base.db')}"
+
     model_config = SettingsConfigDict(env_file=os.path.join(os.path.dirname(__file__), ".env"))
 
 
@@ -0,0 +1,172 @@
+import asyncio
+import base64
+import binascii
+import hashlib
+import io
+import os
+import re
+import tempfile
+from pathlib import Path
+from typing import Iterable, Optional
+
+from fastapi import HTTPException
+
+from ..settings.config import settings
+from ..settings.logging_config import logger
+
+try:
+    from PIL import Image
+except ImportError:  # Без Pillow миниатюры не создаются, отдаётся оригинал
+    Image = None
+
+# Ссылка на изображение, которая хранится в базе вместо самих данных
+IMAGE_URL_PREFIX = "/images/"
+IMAGE_NAME_RE = re.compile(r"^[0-9a-f]{64}\.(jpg|png|gif|webp)$")
+
+CONTENT_TYPES = {
+    "jpg": "image/jpeg",
+    "png": "image/png",
+    "gif": "image/gif",
+    "webp": "image/webp",
+}
+
+
+def sniff_extension(data: bytes) -> Optional[str]:
+    if data.startswith(b"\xff\xd8\xff"):
+        return "jpg"
+    if data.startswith(b"\x89PNG\r\n\x1a\n"):
+        return "png"
+    if data.startswith((b"GIF87a", b"GIF89a")):
+        return "gif"
+    if data[:4] == b"RIFF" and data[8:12] == b"WEBP":
+        return "webp"
+    return None
+
+
+def is_reference(value: str) -> bool:
+    # Ссылки, которые хранятся как есть: внешние адреса и изображения из этого хранилища
+    return value.startswith(("http://", "https://", IMAGE_URL_PREFIX))
+
+
+def decode_inline_image(value: str) -> Optional[bytes]:
+    """
+    Достать байты из data URL или голой строки base64. Для ссылок и данных, не похожих на изображение, возвращает None.
+    Голый base64 JPEG начинается с "/9j/", поэтому по первому символу строку не отбрасываем — решают магические байты.
+    """
+    if value.startswith("data:"):
+        header, _, value = value.partition(",")
+        if ";base64" not in header:
+            return None
+    elif is_reference(value) or len(value) < 64:
+        return None
+    try:
+        data = base64.b64decode(value, validate=False)
+    except (binascii.Error, ValueError):
+        return None
+    return data if sniff_extension(data) else None
+
+
+class ImageStore:
+    """
+    Файловое хранилище изображений с адресацией по содержимому.
+    Имя файла — sha256 данных, поэтому одинаковые загрузки хранятся один раз.
+    Для каждого изображения заранее создаются уменьшенные копии заданной ширины.
+    """
+
+    def __init__(self, root: str, thumbnail_widths: Iterable[int], max_bytes: int):
+        self.root = Path(root)
+        self.thumbnail_widths = tuple(sorted(thumbnail_widths))
+        self.max_bytes = max_bytes
+
+    def path_for(self, name: str) -> Path:
+        return self.root / "originals" / name[:2] / name[2:4] / name
+
+    def thumbnail_path_for(self, name: str, width: int) -> Path:
+        digest = name.split(".")[0]
+        return self.root / "thumbnails" / name[:2] / name[2:4] / f"{digest}_{width}.webp"
+
+    @staticmethod
+    def _write_atomic(path: Path, data: bytes):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=path.parent)
+        with os.fdopen(fd, "wb") as tmp:
+            tmp.write(data)
+        os.replace(tmp_path, path)
+
+    def _make_thumbnails(self, name: str, data: bytes):
+        if Image is None:
+            return
+        try:
+            with Image.open(io.BytesIO(data)) as image:
+                image.load()
+                for width in self.thumbnail_widths:
+                    path = self.thumbnail_path_for(name, width)
+                    if path.exists() or image.width <= width:
+                        continue
+                    thumbnail = image.copy()
+                    thumbnail.thumbnail((width, width * 10))
+                    if thumbnail.mode not in ("RGB", "RGBA"):
+                        thumbnail = thumbnail.convert("RGBA")
+                    buffer = io.BytesIO()
+                    thumbnail.save(buffer, "WEBP", quality=80)
+                    self._write_atomic(path, buffer.getvalue())
+        except Exception as e:
+            logger.warning(f"Failed to create thumbnails for image {name}: {e}")
+
+    def _save_sync(self, data: bytes) -> str:
+        name = f"{hashlib.sha256(data).hexdigest()}.{sniff_extension(data)}"
+        path = self.path_for(name)
+        if not path.exists():  # Повторная загрузка того же изображения ничего не пишет
+            self._write_atomic(path, data)
+            self._make_thumbnails(name, data)
+        return name
+
+    async def save(self, data: bytes) -> str:
+        if len(data) > self.max_bytes:
+            raise HTTPException(status_code=413, detail="Image is too large")
+        if sniff_extension(data) is None:
+            raise HTTPException(status_code=400, detail="Unsupported image format")
+        # Хэширование, запись на диск и ресайз выполняются вне event loop
+        return await asyncio.to_thread(self._save_sync, data)
+
+    async def store_reference(self, value: Optional[str]) -> Optional[str]:
+        """
+        Сохранить встроенное в запрос изображение и вернуть ссылку на него для записи в базу.
+        Ссылки и пустые значения возвращаются без изменений.
+        """
+        if not value:
+            return value
+        # Клиент мог прислать обратно уже выданный ему абсолютный адрес
+        base_url = settings.MEDIA_BASE_URL.rstrip("/")
+        if base_url and value.startswith(base_url + IMAGE_URL_PREFIX):
+            return value[len(base_url):]
+        data = decode_inline_image(value)
+        if data is None:
+            return value
+        return IMAGE_URL_PREFIX + await self.save(data)
+
+    def thumbnail_for(self, name: str, width: int) -> Optional[Path]:
+        """
+        Наименьшая миниатюра не уже запрошенной ширины, если она есть.
+        """
+        for thumbnail_width in self.thumbnail_widths:
+            if thumbnail_width >= width:
+                path = self.thumbnail_path_for(name, thumbnail_width)
+                if path.exists():
+                    return path
+        return None
+
+
+def image_url(value: Optional[str], width: Optional[int] = None) -> Optional[str]:
+    # В базе хранится относительная ссылка, клиенту отдаётся адрес с учётом MEDIA_BASE_URL
+    if value and value.startswith(IMAGE_URL_PREFIX):
+        url = settings.MEDIA_BASE_URL.rstrip("/") + value
+        return f"{url}?w={width}" if width else url
+    return value
+
+
+image_store = ImageStore(
+    root=settings.IMAGE_STORAGE_DIR,
+    thumbnail_widths=settings.IMAGE_THUMBNAIL_WIDTHS,
+    max_bytes=settings.IMAGE_MAX_BYTES,
+)
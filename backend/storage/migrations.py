@@ -0,0 +1,45 @@
+from sqlalchemy import select, update, func
+
+from ..database import SessionLocal
+from ..models import User, Post
+from ..settings.logging_config import logger
+from .images import image_store, decode_inline_image, IMAGE_URL_PREFIX
+
+
+async def migrate_inline_images(batch_size: int = 100):
+    """
+    Перенести изображения, сохранённые в базе строкой base64, в файловое хранилище.
+    Повторный запуск безопасен: уже перенесённые строки содержат ссылку и пропускаются.
+    Запрос отсекает только ссылки, остальное проверяет decode_inline_image по магическим байтам
+    (голый base64 почти всегда содержит "/", поэтому по нему фильтровать нельзя).
+    """
+    migrated = 0
+    for model, column in ((User, User.profile_image), (Post, Post.main_image)):
+        last_id = 0
+        while True:
+            async with SessionLocal() as db:
+                rows = (await db.execute(
+                    select(model.id, column)
+                    .where(
+                        model.id > last_id,
+                        func.length(column) > 64,
+                        ~column.like("http://%"),
+                        ~column.like("https://%"),
+                        ~column.like(IMAGE_URL_PREFIX + "%"),
+                    )
+                    .order_by(model.id)
+                    .limit(batch_size)
+                )).all()
+                if not rows:
+                    break
+                for row_id, value in rows:
+                    data = decode_inline_image(value)
+                    if data is None or len(data) > image_store.max_bytes:
+                        continue
+                    reference = IMAGE_URL_PREFIX + await image_store.save(data)
+                    await db.execute(update(model).where(model.id == row_id).values({column.key: reference}))
+                    migrated += 1
+                await db.commit()
+                last_id = rows[-1][0]
+    if migrated:
+        logger.info(f"Moved {migrated} inline images to the image store")
@@ -0,0 +1,10 @@
+import os
+import tempfile
+
+# Настройки читаются при импорте модулей бэкенда, поэтому окружение и временная база задаются до него
+os.environ.setdefault("SECRET_KEY", "test-secret-key-" + "x" * 16)
+os.environ.setdefault("ALGORITHM", "HS256")
+os.environ.setdefault("ACCESS_TOKEN_EXPIRE_MINUTES", "60")
+os.environ["DB_URL"] = f"sqlite+aiosqlite:///{os.path.join(tempfile.mkdtemp(prefix='backend-tests-'), 'test.db')}"
+os.environ["METRICS_ENABLED"] = "true"
+os.environ["IMAGE_STORAGE_DIR"] = tempfile.mkdtemp(prefix="backend-tests-media-")
@@ -0,0 +1,86 @@
+"""
+Встроенные изображения (data URL и голый base64) распознаются по магическим байтам и переносятся в хранилище,
+а ссылки остаются как есть.
+"""
+import asyncio
+import base64
+import io
+import random
+
+from PIL import Image
+from sqlalchemy import select
+
+from ..database import SessionLocal, engine, init_db
+from ..models import User
+from ..storage.images import IMAGE_URL_PREFIX, decode_inline_image, image_store
+from ..storage.migrations import migrate_inline_images
+
+
+def encoded_image(image_format: str) -> str:
+    # Шум, чтобы base64 был достаточно длинным и содержал "/" не только в начале
+    rng = random.Random(image_format)
+    image = Image.frombytes("RGB", (32, 32), bytes(rng.randrange(256) for _ in range(32 * 32 * 3)))
+    buffer = io.BytesIO()
+    image.save(buffer, image_format)
+    return base64.b64encode(buffer.getvalue()).decode()
+
+
+def test_bare_jpeg_base64_is_decoded():
+    value = encoded_image("JPEG")
+    assert value.startswith("/9j/")
+    assert decode_inline_image(value).startswith(b"\xff\xd8\xff")
+
+
+def test_bare_png_base64_is_decoded():
+    value = encoded_image("PNG")
+    assert "/" in value
+    assert decode_inline_image(value).startswith(b"\x89PNG")
+
+
+def test_data_url_is_decoded():
+    assert decode_inline_image("data:image/png;base64," + encoded_image("PNG")).startswith(b"\x89PNG")
+
+
+def test_references_and_other_text_are_not_decoded():
+    for value in (
+        "https://example.com/" + "a" * 80 + ".png",
+        "http://example.com/" + "a" * 80 + ".jpg",
+        IMAGE_URL_PREFIX + "0" * 64 + ".png",
+        "/static/avatars/" + "a" * 80 + ".png",
+        base64.b64encode(b"not an image" * 10).decode(),
+    ):
+        assert decode_inline_image(value) is None
+
+
+async def migrate_avatars(avatars: dict) -> dict:
+    await init_db()
+    async with SessionLocal() as db:
+        db.add_all([
+            User(username=f"avatar_{name}", email=f"avatar_{name}@example.com", hashed_password="-", profile_image=value)
+            for name, value in avatars.items()
+        ])
+        await db.commit()
+    await migrate_inline_images()
+    async with SessionLocal() as db:
+        rows = (await db.execute(
+            select(User.username, User.profile_image).where(User.username.like("avatar_%"))
+        )).all()
+    # Соединения пула привязаны к event loop, а каждый тест запускает свой
+    await engine.dispose()
+    return {username.removeprefix("avatar_"): profile_image for username, profile_image in rows}
+
+
+def test_migration_moves_bare_base64_images():
+    link = "https://example.com/" + "a" * 80 + ".png"
+    avatars = {
+        "jpeg": encoded_image("JPEG"),
+        "png": encoded_image("PNG"),
+        "data_url": "data:image/jpeg;base64," + encoded_image("JPEG"),
+        "link": link,
+    }
+    migrated = asyncio.run(migrate_avatars(avatars))
+
+    for name in ("jpeg", "png", "data_url"):
+        assert migrated[name].startswith(IMAGE_URL_PREFIX)
+        assert image_store.path_for(migrated[name][len(IMAGE_URL_PREFIX):]).exists()
+    assert migrated["link"] == link
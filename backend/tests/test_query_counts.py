@@ -0,0 +1,74 @@
+"""
+Число SQL-запросов на ленту и страницу поста не должно зависеть от числа постов, комментариев и просмотров.
+Запросы считаются гистограммой http_request_db_queries по шаблону маршрута (только запросы самого HTTP-запроса,
+без фоновых воркеров).
+"""
+import asyncio
+from datetime import datetime, timedelta
+
+import httpx
+import pytest
+
+from ..database import SessionLocal
+from ..instrumentation import REQUEST_QUERIES
+from ..main import app
+from ..models import Post, PostComment, PostLike, PostView, User
+
+SMALL, LARGE = 3, 30
+
+
+async def seed():
+    async with SessionLocal() as db:
+        users = [User(username=f"user{i}", email=f"user{i}@example.com", hashed_password="-") for i in range(LARGE)]
+        db.add_all(users)
+        await db.flush()
+        started = datetime.now() - timedelta(days=1)
+        for i in range(LARGE):
+            post = Post(title=f"Post {i}", body="<p>text</p>", author_id=users[i % 5].id, slug=f"test/{i}",
+                        tags=["test"], category="test", date=started + timedelta(minutes=i))
+            db.add(post)
+            await db.flush()
+            # У поста i — i+1 комментариев, просмотров и лайков от разных пользователей
+            db.add_all([PostComment(post_id=post.id, author_id=users[j].id, body=f"Comment {j}") for j in range(i + 1)])
+            db.add_all([PostView(post_id=post.id, ip_address=f"10.0.0.{j}") for j in range(i + 1)])
+            db.add_all([PostLike(post_id=post.id, user_id=users[j].id) for j in range(i + 1)])
+            post.comments_count = post.views_count = post.likes = i + 1
+        await db.commit()
+
+
+async def count_queries(client: httpx.AsyncClient, url: str, route: str) -> int:
+    before_total, before_count = REQUEST_QUERIES.totals().get(("GET", route), (0, 0))
+    response = await client.get(url)
+    response.raise_for_status()
+    total, count = REQUEST_QUERIES.totals()[("GET", route)]
+    assert count == before_count + 1
+    return int(total - before_total)
+
+
+async def measure() -> dict:
+    async with app.router.lifespan_context(app):
+        await seed()
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return {
+                "feed": [await count_queries(client, f"/get_all_posts?count={count}", "/get_all_posts")
+                         for count in (SMALL, LARGE)],
+                # test/2 — пост с 3 комментариями и просмотрами, test/29 — с 30
+                "post": [await count_queries(client, f"/getpost/test/{count - 1}/", "/getpost/{slug:path}/")
+                         for count in (SMALL, LARGE)],
+            }
+
+
+@pytest.fixture(scope="module")
+def query_counts():
+    return asyncio.run(measure())
+
+
+def test_feed_query_count_does_not_grow_with_page_size(query_counts):
+    small, large = query_counts["feed"]
+    assert small == large
+
+
+def test_post_query_count_does_not_grow_with_comments_and_views(query_counts):
+    small, large = query_counts["post"]
+    assert small == large
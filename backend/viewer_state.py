@@ -0,0 +1,49 @@
+# viewer_state.py
+from typing import Iterable, List, Optional, Sequence, Set
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .models import Follow, PostLike, User
+
+# Query-параметр, включающий в ленты флаги текущего пользователя; такие ответы не кэшируются
+VIEWER_STATE_PARAM = "with_viewer_state"
+
+
+async def liked_post_ids(db: AsyncSession, user_id: int, post_ids: Iterable[int]) -> Set[int]:
+    """
+    Какие из постов лайкнуты пользователем — одним запросом IN (...).
+    """
+    post_ids = set(post_ids)
+    if not post_ids:
+        return set()
+    return set((await db.scalars(
+        select(PostLike.post_id).where(PostLike.user_id == user_id, PostLike.post_id.in_(post_ids))
+    )).all())
+
+
+async def followed_user_ids(db: AsyncSession, user_id: int, user_ids: Iterable[int]) -> Set[int]:
+    """
+    На кого из пользователей подписан пользователь — одним запросом IN (...).
+    """
+    user_ids = set(user_ids)
+    if not user_ids:
+        return set()
+    return set((await db.scalars(
+        select(Follow.followed_id).where(Follow.follower_id == user_id, Follow.followed_id.in_(user_ids))
+    )).all())
+
+
+async def add_viewer_state(db: AsyncSession, viewer: Optional[User], posts: Sequence, items: List[dict]) -> List[dict]:
+    """
+    Дописать в сериализованные посты флаги текущего пользователя: is_liked и is_following_author.
+    posts и items идут в одном порядке; на всю страницу — два запроса независимо от её размера.
+    """
+    if viewer is None:
+        return items
+    liked = await liked_post_ids(db, viewer.id, (post.id for post in posts))
+    followed = await followed_user_ids(db, viewer.id, (post.author_id for post in posts))
+    for post, item in zip(posts, items):
+        item["is_liked"] = post.id in liked
+        item["is_following_author"] = post.author_id in followed
+    return items
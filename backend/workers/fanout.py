@@ -0,0 +1,82 @@
+import asyncio
+from datetime import datetime
+
+from sqlalchemy import select, insert, literal, String, DateTime
+
+from ..database import SessionLocal
+from ..hooks.websocket import notify_users_update
+from ..models import Follow, Notification
+from ..settings.config import settings
+from ..settings.logging_config import logger
+
+
+class FollowerFanout:
+    """
+    Фоновая рассылка уведомлений подписчикам о новом посте.
+    Уведомления создаются пачками одним INSERT ... SELECT из follows, после каждой пачки отправляются пуши.
+    """
+
+    def __init__(self, chunk_size: int):
+        self.chunk_size = chunk_size
+        self._queue: asyncio.Queue = asyncio.Queue()
+        self._task = None
+
+    def enqueue(self, author_id: int, title: str, description: str, link: str):
+        self._queue.put_nowait((author_id, title, description, link))
+
+    async def fan_out(self, author_id: int, title: str, description: str, link: str):
+        last_follower_id = 0
+        while True:
+            # Дата — момент вставки пачки, а не постановки в очередь: иначе пачки, записанные позже других
+            # уведомлений, оказались бы старше них, и клиент, запрашивающий since, их бы пропустил
+            date = datetime.now()
+            followers = (
+                select(
+                    Follow.follower_id,
+                    literal(title, String),
+                    literal(description, String),
+                    literal(link, String),
+                    literal(date, DateTime),
+                )
+                .where(Follow.followed_id == author_id, Follow.follower_id > last_follower_id)
+                .order_by(Follow.follower_id)
+                .limit(self.chunk_size)
+            )
+            async with SessionLocal() as db:
+                notifications = (await db.execute(
+                    insert(Notification)
+                    .from_select(["user_id", "title", "description", "link", "date"], followers)
+                    .returning(Notification.id, Notification.user_id, Notification.title,
+                               Notification.description, Notification.link, Notification.date)
+                )).all()
+                await db.commit()
+
+            if not notifications:
+                return
+            await notify_users_update(notifications)
+            last_follower_id = max(notification.user_id for notification in notifications)
+            if len(notifications) < self.chunk_size:
+                return
+
+    async def _run(self):
+        while True:
+            job = await self._queue.get()
+            if job is None:
+                return
+            try:
+                await self.fan_out(*job)
+            except Exception as e:
+                logger.error(f"Failed to fan out notifications of user {job[0]}: {e}")
+
+    async def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        # Дорассылаем уже поставленные в очередь посты перед остановкой
+        if self._task is not None:
+            self._queue.put_nowait(None)
+            await self._task
+            self._task = None
+
+
+follower_fanout = FollowerFanout(chunk_size=settings.FANOUT_CHUNK_SIZE)
@@ -0,0 +1,83 @@
+import asyncio
+from datetime import datetime, timedelta
+from typing import Dict, List
+
+from sqlalchemy import select, func
+
+from ..database import SessionLocal
+from ..models import Post, PostView
+from ..settings.config import settings
+from ..settings.logging_config import logger
+
+# Окна рейтинга: за всё время и по просмотрам за последние сутки/неделю
+WINDOWS = {
+    "all": None,
+    "24h": timedelta(hours=24),
+    "7d": timedelta(days=7),
+}
+
+
+class Leaderboard:
+    """
+    Предрасчитанный рейтинг популярных постов.
+    Фоновая задача периодически пересчитывает первые `size` мест для каждого окна,
+    а запросы только читают готовый список id.
+    """
+
+    def __init__(self, size: int, refresh_interval: float, like_weight: float):
+        self.size = size
+        self.refresh_interval = refresh_interval
+        self.like_weight = like_weight
+        self.refreshed_at = None
+        self._rankings: Dict[str, List[int]] = {window: [] for window in WINDOWS}
+        self._task = None
+
+    def top(self, window: str, count: int) -> List[int]:
+        return self._rankings[window][:count]
+
+    async def refresh(self):
+        rankings = {}
+        async with SessionLocal() as db:
+            for window, period in WINDOWS.items():
+                if period is None:
+                    # За всё время: денормализованные счётчики, без обращения к post_views
+                    score = Post.views_count + func.coalesce(Post.likes, 0) * self.like_weight
+                    query = select(Post.id).order_by(score.desc(), Post.id.desc())
+                else:
+                    query = (
+                        select(PostView.post_id)
+                        .where(PostView.timestamp >= datetime.now() - period)
+                        .group_by(PostView.post_id)
+                        .order_by(func.count(PostView.id).desc(), PostView.post_id.desc())
+                    )
+                rankings[window] = list((await db.scalars(query.limit(self.size))).all())
+        self._rankings = rankings
+        self.refreshed_at = datetime.now()
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.refresh_interval)
+            try:
+                await self.refresh()
+            except Exception as e:
+                logger.error(f"Failed to refresh leaderboard: {e}")
+
+    async def start(self):
+        await self.refresh()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+leaderboard = Leaderboard(
+    size=settings.LEADERBOARD_SIZE,
+    refresh_interval=settings.LEADERBOARD_REFRESH_INTERVAL,
+    like_weight=settings.LEADERBOARD_LIKE_WEIGHT,
+)
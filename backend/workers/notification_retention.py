@@ -0,0 +1,69 @@
+import asyncio
+from datetime import datetime, timedelta
+
+from sqlalchemy import select, delete, or_, and_
+
+from ..database import SessionLocal
+from ..models import Notification
+from ..settings.config import settings
+from ..settings.logging_config import logger
+
+
+class NotificationRetention:
+    """
+    Периодическое удаление старых уведомлений: прочитанных — после короткого срока, остальных — после длинного.
+    Удаление идёт пачками, чтобы не держать долгую блокировку записи.
+    """
+
+    def __init__(self, read_retention: timedelta, retention: timedelta, interval: float, batch_size: int = 5000):
+        self.read_retention = read_retention
+        self.retention = retention
+        self.interval = interval
+        self.batch_size = batch_size
+        self._task = None
+
+    async def compact(self) -> int:
+        now = datetime.now()
+        expired = or_(
+            Notification.date < now - self.retention,
+            and_(Notification.is_read.is_(True), Notification.date < now - self.read_retention),
+        )
+        removed = 0
+        while True:
+            async with SessionLocal() as db:
+                batch = select(Notification.id).where(expired).limit(self.batch_size)
+                result = await db.execute(delete(Notification).where(Notification.id.in_(batch)))
+                await db.commit()
+            removed += result.rowcount
+            if result.rowcount < self.batch_size:
+                break
+        if removed:
+            logger.info(f"Removed {removed} old notifications")
+        return removed
+
+    async def _run(self):
+        while True:
+            try:
+                await self.compact()
+            except Exception as e:
+                logger.error(f"Failed to compact notifications: {e}")
+            await asyncio.sleep(self.interval)
+
+    async def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+notification_retention = NotificationRetention(
+    read_retention=timedelta(days=settings.NOTIFICATION_READ_RETENTION_DAYS),
+    retention=timedelta(days=settings.NOTIFICATION_RETENTION_DAYS),
+    interval=settings.NOTIFICATION_COMPACTION_INTERVAL,
+)
@@ -0,0 +1,127 @@
+import asyncio
+from typing import List, Tuple
+
+from sqlalchemy import select, insert, delete, func, cast, Float, exists
+
+from ..database import SessionLocal
+from ..models import Post, PostTag, RelatedPost
+from ..settings.config import settings
+from ..settings.logging_config import logger
+
+
+class RelatedPostsIndexer:
+    """
+    Фоновый пересчёт похожих постов по тегам.
+    Для изменившегося поста пересчитывается его список, а он сам добавляется в списки постов с общими тегами,
+    которые затем обрезаются до `size` лучших.
+    """
+
+    def __init__(self, size: int, candidate_limit: int):
+        self.size = size
+        self.candidate_limit = candidate_limit
+        self._queue: asyncio.Queue = asyncio.Queue()
+        self._task = None
+
+    def enqueue(self, post_id: int):
+        self._queue.put_nowait(post_id)
+
+    async def score_candidates(self, db, post_id: int) -> List[Tuple[int, float]]:
+        own_tags = select(PostTag.tag).where(PostTag.post_id == post_id)
+        own_size = select(func.count()).select_from(PostTag).where(PostTag.post_id == post_id).scalar_subquery()
+        overlap = (
+            select(PostTag.post_id, func.count().label("overlap"))
+            .where(PostTag.tag.in_(own_tags), PostTag.post_id != post_id)
+            .group_by(PostTag.post_id)
+            .subquery()
+        )
+        sizes = (
+            select(PostTag.post_id, func.count().label("size"))
+            .where(PostTag.post_id.in_(select(overlap.c.post_id)))
+            .group_by(PostTag.post_id)
+            .subquery()
+        )
+        # |A ∩ B| / |A ∪ B|
+        score = cast(overlap.c.overlap, Float) / (own_size + sizes.c.size - overlap.c.overlap)
+        rows = await db.execute(
+            select(overlap.c.post_id, score.label("score"))
+            .join(sizes, sizes.c.post_id == overlap.c.post_id)
+            .order_by(score.desc(), overlap.c.post_id.desc())
+            .limit(self.candidate_limit)
+        )
+        return [(candidate_id, candidate_score) for candidate_id, candidate_score in rows]
+
+    async def refresh(self, post_id: int):
+        async with SessionLocal() as db:
+            candidates = await self.score_candidates(db, post_id)
+            candidate_ids = [candidate_id for candidate_id, _ in candidates]
+
+            await db.execute(delete(RelatedPost).where(
+                (RelatedPost.post_id == post_id)
+                | ((RelatedPost.related_post_id == post_id) & RelatedPost.post_id.in_(candidate_ids))
+            ))
+            if candidates:
+                await db.execute(insert(RelatedPost), [
+                    {"post_id": post_id, "related_post_id": candidate_id, "score": score}
+                    for candidate_id, score in candidates[:self.size]
+                ] + [
+                    {"post_id": candidate_id, "related_post_id": post_id, "score": score}
+                    for candidate_id, score in candidates
+                ])
+                # Оставляем каждому затронутому посту только лучшие `size` записей
+                ranked = (
+                    select(
+                        RelatedPost.id,
+                        func.row_number().over(
+                            partition_by=RelatedPost.post_id,
+                            order_by=(RelatedPost.score.desc(), RelatedPost.related_post_id.desc()),
+                        ).label("position"),
+                    )
+                    .where(RelatedPost.post_id.in_(candidate_ids))
+                    .subquery()
+                )
+                await db.execute(delete(RelatedPost).where(
+                    RelatedPost.id.in_(select(ranked.c.id).where(ranked.c.position > self.size))
+                ))
+            await db.commit()
+
+    async def backfill(self):
+        """
+        Заполнить post_tags из Post.tags для постов, созданных до появления таблицы, и посчитать для них похожие.
+        """
+        async with SessionLocal() as db:
+            posts = (await db.execute(
+                select(Post.id, Post.tags)
+                .where(Post.tags.isnot(None), ~exists().where(PostTag.post_id == Post.id))
+            )).all()
+            rows = [{"post_id": post_id, "tag": tag} for post_id, tags in posts for tag in PostTag.normalize(tags)]
+            if rows:
+                await db.execute(insert(PostTag), rows)
+                await db.commit()
+        for post_id in sorted({row["post_id"] for row in rows}):
+            self.enqueue(post_id)
+
+    async def _run(self):
+        while True:
+            post_id = await self._queue.get()
+            if post_id is None:
+                return
+            try:
+                await self.refresh(post_id)
+            except Exception as e:
+                logger.error(f"Failed to refresh related posts of post {post_id}: {e}")
+
+    async def start(self):
+        await self.backfill()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._queue.put_nowait(None)
+            await self._task
+            self._task = None
+
+
+related_posts_indexer = RelatedPostsIndexer(
+    size=settings.RELATED_POSTS_COUNT,
+    candidate_limit=settings.RELATED_POSTS_CANDIDATES,
+)
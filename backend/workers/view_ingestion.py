@@ -0,0 +1,129 @@
+import asyncio
+from collections import Counter
+from datetime import datetime, timedelta
+from typing import Dict, List, Tuple
+
+from sqlalchemy import select, insert, update, bindparam
+
+from ..database import SessionLocal
+from ..models import Post, PostView
+from ..settings.config import settings
+from ..settings.logging_config import logger
+
+
+class ViewIngestion:
+    """
+    Приём просмотров постов с отложенной записью.
+    Повторные просмотры с одного IP отсекаются в памяти, новые пачкой пишутся в базу по таймеру,
+    а Post.views_count увеличивается инкрементально в той же транзакции.
+    """
+
+    def __init__(self, flush_interval: float, batch_size: int, dedup_window: timedelta):
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.dedup_window = dedup_window
+        self._recent: Dict[Tuple[int, str], datetime] = {}
+        self._pending: List[Tuple[int, str, datetime]] = []
+        self._pending_counts: Counter = Counter()
+        self._flush_requested = asyncio.Event()
+        self._lock = asyncio.Lock()
+        self._task = None
+
+    def record(self, post_id: int, ip_address: str) -> bool:
+        """
+        Зарегистрировать просмотр. Возвращает False, если просмотр с этого IP уже учтён за окно.
+        """
+        now = datetime.now()
+        key = (post_id, ip_address)
+        last_seen = self._recent.get(key)
+        if last_seen is not None and last_seen >= now - self.dedup_window:
+            return False
+
+        self._recent[key] = now
+        self._pending.append((post_id, ip_address, now))
+        self._pending_counts[post_id] += 1
+        if len(self._pending) >= self.batch_size:
+            self._flush_requested.set()
+        return True
+
+    def pending_count(self, post_id: int) -> int:
+        return self._pending_counts[post_id]
+
+    async def flush(self):
+        async with self._lock:
+            if not self._pending:
+                return
+            batch, self._pending = self._pending, []
+            counts, self._pending_counts = Counter(post_id for post_id, _, _ in batch), Counter()
+
+            try:
+                async with SessionLocal() as db:
+                    await db.execute(insert(PostView), [
+                        {"post_id": post_id, "ip_address": ip_address, "timestamp": timestamp}
+                        for post_id, ip_address, timestamp in batch
+                    ])
+                    posts = Post.__table__
+                    await db.execute(
+                        update(posts)
+                        .where(posts.c.id == bindparam("post_id"))
+                        .values(views_count=posts.c.views_count + bindparam("delta")),
+                        [{"post_id": post_id, "delta": delta} for post_id, delta in counts.items()],
+                    )
+                    await db.commit()
+            except Exception as e:
+                # Возвращаем пачку в очередь, чтобы не потерять просмотры
+                logger.error(f"Failed to flush {len(batch)} post views: {e}")
+                self._pending = batch + self._pending
+                self._pending_counts.update(counts)
+                return
+
+            logger.debug(f"Flushed {len(batch)} post views for {len(counts)} posts")
+        self._prune()
+
+    def _prune(self):
+        threshold = datetime.now() - self.dedup_window
+        self._recent = {key: seen for key, seen in self._recent.items() if seen >= threshold}
+
+    async def warm_up(self):
+        """
+        Восстановить окно дедупликации из базы после перезапуска.
+        """
+        async with SessionLocal() as db:
+            rows = await db.execute(
+                select(PostView.post_id, PostView.ip_address, PostView.timestamp)
+                .where(PostView.timestamp >= datetime.now() - self.dedup_window)
+            )
+            for post_id, ip_address, timestamp in rows:
+                key = (post_id, ip_address)
+                if self._recent.get(key, datetime.min) < timestamp:
+                    self._recent[key] = timestamp
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._flush_requested.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._flush_requested.clear()
+            await self.flush()
+
+    async def start(self):
+        await self.warm_up()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+
+view_ingestion = ViewIngestion(
+    flush_interval=settings.VIEW_FLUSH_INTERVAL,
+    batch_size=settings.VIEW_FLUSH_BATCH_SIZE,
+    dedup_window=timedelta(minutes=settings.VIEW_DEDUP_WINDOW_MINUTES),
+)
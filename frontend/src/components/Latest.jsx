@@ -314,7 +314,6 @@ export default function Latest() {
               <Typography
                 variant="body2"
                 paragraph
-                dangerouslySetInnerHTML={{ __html: post.body }}
                 color="text.secondary"
                 gutterBottom
                 sx={{ display: '-webkit-box',
@@ -323,7 +322,9 @@ export default function Latest() {
                   overflow: 'hidden',
                   textOverflow: 'ellipsis',
                  }}
-              />
+              >
+                {post.excerpt}
+              </Typography>
               </SyledCardContent>
 
               <Author author={post.author} date={post.date} />
@@ -344,7 +345,7 @@ export default function Latest() {
                   />
                   <IconText
                     icon={MessageOutlined}
-                    text={post.comments.length}
+                    text={post.comments_count}
                     key="list-vertical-message"
                   />
                   <IconText
@@ -203,7 +203,6 @@ export default function MainPage() {
                 <Typography
                 variant="body2"
                 paragraph
-                dangerouslySetInnerHTML={{ __html: post.body }}
                 color="text.secondary"
                 gutterBottom
                 sx={{ display: '-webkit-box',
@@ -212,7 +211,9 @@ export default function MainPage() {
                   overflow: 'hidden',
                   textOverflow: 'ellipsis',
                  }}
-              />
+              >
+                {post.excerpt}
+              </Typography>
               </SyledCardContent>
               <Author author={post.author} date={post.date} />
               <Box
@@ -233,7 +234,7 @@ export default function MainPage() {
                   />
                   <IconText
                     icon={MessageOutlined}
-                    text={post.comments.length}
+                    text={post.comments_count}
                     key="list-vertical-message"
                   />
                   <IconText
@@ -6,6 +6,7 @@ import PostPage from "./PostPage";
 const PostLoader = () => {
   const { "*": slug } = useParams(); // Извлекаем остаточный путь как slug
   const [post, setPost] = useState(null);
+  const [commentsCursor, setCommentsCursor] = useState(null);
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState(null);
 
@@ -13,7 +14,8 @@ const PostLoader = () => {
     const loadPost = async () => {
       try {
         const data = await getPost(slug); // Используем функцию из api.js
-        setPost(data);
+        setPost(data.post);
+        setCommentsCursor(data.commentsCursor);
       } catch (err) {
         setError("Failed to load post");
       } finally {
@@ -27,7 +29,7 @@ const PostLoader = () => {
   if (loading) return <p>Загрузка...</p>;
   if (error) return <p>{error}</p>;
 
-  return <PostPage post={post} />;
+  return <PostPage post={post} commentsCursor={commentsCursor} />;
 };
 
 export default PostLoader;
@@ -18,16 +18,19 @@ import {
 import { Link } from 'react-router-dom';
 import FavoriteBorderOutlinedIcon from "@mui/icons-material/FavoriteBorderOutlined";
 import FavoriteOutlinedIcon from "@mui/icons-material/FavoriteOutlined";
-import { get_related_posts, createComment, likePost, unlikePost, checkPostIsLiked, increment_views } from "../server-side/posts";
+import { get_related_posts, createComment, likePost, unlikePost, checkPostIsLiked, increment_views, getPostComments } from "../server-side/posts";
 import VisibilityOutlinedIcon from '@mui/icons-material/VisibilityOutlined';
 import { AuthContext } from "../contexts/AuthContext";
 
-const ContentPost = ({ post }) => {
+const ContentPost = ({ post, commentsCursor }) => {
   const { user: currentUser, isAuthenticated } = useContext(AuthContext);
   const [likes, setLikes] = useState(post.likes);
   const [hasLiked, setHasLiked] = useState(false);
   const [newComment, setNewComment] = useState("");
-  const [comments, setComments] = useState(post?.comments || []);
+  // Сервер отдаёт комментарии от новых к старым, а показываются они в хронологическом порядке
+  const [comments, setComments] = useState([...(post?.comments || [])].reverse());
+  const [olderCommentsCursor, setOlderCommentsCursor] = useState(commentsCursor);
+  const [commentsLoading, setCommentsLoading] = useState(false);
   const [relatedPosts, setRelatedPosts] = useState([]);
   const [token, setToken] = useState(localStorage.getItem('token') || null);
   const [hasViewed, setHasViewed] = useState(false);
@@ -81,6 +84,19 @@ const ContentPost = ({ post }) => {
     }
 };
 
+  const loadOlderComments = async () => {
+    setCommentsLoading(true);
+    try {
+      const { comments: olderComments, nextCursor } = await getPostComments(post.id, olderCommentsCursor);
+      setComments((prevComments) => [...olderComments.reverse(), ...prevComments]);
+      setOlderCommentsCursor(nextCursor);
+    } catch (error) {
+      console.error("Failed to load comments:", error);
+    } finally {
+      setCommentsLoading(false);
+    }
+  };
+
   const handleCommentSubmit = async (e) => {
     e.preventDefault();
 
@@ -188,6 +204,11 @@ const ContentPost = ({ post }) => {
               </form>
               
               <Box sx={{ mt: 3 }}>
+              {olderCommentsCursor && (
+                <Button onClick={loadOlderComments} disabled={commentsLoading} sx={{ mb: 1 }}>
+                  {commentsLoading ? "Загрузка..." : "Показать предыдущие комментарии"}
+                </Button>
+              )}
               {comments.map((comment) => (
                 <>
                 <Paper key={comment.id} sx={{ p: 1, mb: 1 }}>
@@ -72,6 +72,8 @@ const UserProfile = ({ isMyProfile }) => {
   const { userId } = useParams();
   const [user, setUser] = useState(null);
   const [posts, setPosts] = useState([]);
+  const [postsCursor, setPostsCursor] = useState(null);
+  const [postsLoading, setPostsLoading] = useState(false);
   const [loading, setLoading] = useState(true);
   const [isFollowing, setIsFollowing] = useState(false);
   const [actionLoading, setActionLoading] = useState(false);
@@ -99,8 +101,9 @@ const UserProfile = ({ isMyProfile }) => {
           }
         }
 
-        const userPosts = await getPostsForUser(userData.id, token);
+        const { posts: userPosts, nextCursor } = await getPostsForUser(userData.id);
         setPosts(userPosts);
+        setPostsCursor(nextCursor);
       } catch (error) {
         console.error("Error loading profile:", error);
       } finally {
@@ -123,7 +126,8 @@ const UserProfile = ({ isMyProfile }) => {
       console.log("Submitting Form Data:", formData); // Проверяем отправляемые данные
       const updatedUser = await updateUserProfile(formData, token);
   
-      setUser(updatedUser);
+      // Ответ на обновление не содержит счётчиков, они остаются из загруженного профиля
+      setUser((prev) => ({ ...prev, ...updatedUser }));
       setSnackbar({ open: true, message: "Профиль обновлён!", severity: "success" });
       setOpenModal(false);
     } catch (error) {
@@ -133,6 +137,19 @@ const UserProfile = ({ isMyProfile }) => {
   };
   
 
+  const loadMorePosts = async () => {
+    setPostsLoading(true);
+    try {
+      const { posts: morePosts, nextCursor } = await getPostsForUser(user.id, postsCursor);
+      setPosts((prev) => [...prev, ...morePosts]);
+      setPostsCursor(nextCursor);
+    } catch (error) {
+      console.error("Error loading more posts:", error);
+    } finally {
+      setPostsLoading(false);
+    }
+  };
+
   const handleFollow = async () => {
     setActionLoading(true);
     try {
@@ -257,7 +274,7 @@ const UserProfile = ({ isMyProfile }) => {
                   <Grid item xs={6} sm={6}>
                     <StatBox>
                       <PostAddIcon fontSize="medium" sx={{color: "#9000ff"}} />
-                      <Typography variant="body2">{posts.length}</Typography>
+                      <Typography variant="body2">{user.posts_count}</Typography>
                       <Typography variant="body2">Постов</Typography>
                     </StatBox>
                   </Grid>
@@ -313,6 +330,11 @@ const UserProfile = ({ isMyProfile }) => {
                     </>
             )}
               </List>
+              {postsCursor && (
+                <Button variant="outlined" onClick={loadMorePosts} disabled={postsLoading} fullWidth>
+                  {postsLoading ? "Загрузка..." : "Показать ещё"}
+                </Button>
+              )}
             </CardContent>
           </Card>
         </Grid>
@@ -29,10 +29,13 @@ export const createPostForUser = async (user_id, postData, token) => {
     }
 };
 
-export const getPostsForUser = async (user_id) => {
+export const getPostsForUser = async (user_id, cursor = null, count = 20) => {
     try {
-        const response = await axios.get(`${API_URL}/get_posts_for_user/${user_id}`);
-        return response.data;
+        // Следующая страница запрашивается по курсору из заголовка X-Next-Cursor предыдущей
+        const response = await axios.get(`${API_URL}/get_posts_for_user/${user_id}/`, {
+            params: cursor ? { cursor, count } : { count },
+        });
+        return { posts: response.data, nextCursor: response.headers['x-next-cursor'] || null };
     } catch (error) {
         console.error('Error fetching user posts:', error);
         throw error;
@@ -57,14 +60,27 @@ export const getAllPosts = async (page = 1, count = 3) => {
 
 export const getPost = async (slug) => {
     try {
-        const response = await axios.get(`${API_URL}/getpost/${slug}`);
-        return response.data;
+        // В посте только последние комментарии; курсор для более ранних — в заголовке X-Next-Cursor
+        const response = await axios.get(`${API_URL}/getpost/${slug}/`);
+        return { post: response.data, commentsCursor: response.headers['x-next-cursor'] || null };
     } catch (error) {
         console.error('Error fetching all posts:', error);
         throw error;
     }
 };
 
+export const getPostComments = async (post_id, cursor = null, count = 20) => {
+    try {
+        const response = await axios.get(`${API_URL}/posts/${post_id}/comments`, {
+            params: cursor ? { cursor, count } : { count },
+        });
+        return { comments: response.data, nextCursor: response.headers['x-next-cursor'] || null };
+    } catch (error) {
+        console.error('Error fetching comments:', error);
+        throw error;
+    }
+};
+
 export const createComment = async (post_id, body, token) => {
     try {
         const response = await axios.post(